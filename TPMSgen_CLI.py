@@ -1,9 +1,77 @@
+import argparse
+import importlib.util
+import json
+import multiprocessing
 import os
 
-from src import core
-
 if __name__ == "__main__":
+    # Worker processes of frozen builds (they start the executable again where processes are spawned):
+    multiprocessing.freeze_support()
+
+    # Command line options:
+    parser = argparse.ArgumentParser(description = 'TPMSgen - Triply Periodic Minimal Surfaces generator (CLI version)')
+    parser.add_argument('--workers', type = int, default = 1, help = 'number of processes used to generate the mesh (default = 1)')
+    parser.add_argument('--replicate-cells', action = 'store_true', help = 'mesh a single unit cell and replicate it over the inner cells of the specimen')
+    parser.add_argument('--cache-dir', help = 'directory of the on-disk cache of generated meshes (disabled by default)')
+    parser.add_argument('--cache-size', type = float, default = 1024, help = 'maximum size of the mesh cache in MB (default = 1024)')
+    parser.add_argument('--precision', choices = ['float64', 'float32'], default = 'float64', help = 'floating point precision of the TPMS field (float32 halves the memory of the grid, default = float64)')
+    parser.add_argument('--sparse', action = 'store_true', help = 'skip the blocks of the grid that cannot contain the surface when meshing')
+    parser.add_argument('--no-render', action = 'store_true', help = 'do not show the TPMS, face normals and mesh figures')
+    parser.add_argument('--png-dir', help = 'render the figures off-screen into PNG files in this directory instead of showing them')
+    parser.add_argument('--check-normals', action = 'store_true', help = 'show the face normals and ask whether to flip them before generating the mesh')
+    parser.add_argument('--flip-face-normals', action = 'store_true', help = 'flip the face normals to generate the opposite solution')
+    parser.add_argument('--job', help = 'JSON/YAML job file to generate in batch mode (no interaction and no rendering)')
+    parser.add_argument('--parallel-jobs', type = int, default = 1, help = 'number of batch jobs generated in parallel (default = 1)')
+    parser.add_argument('--memory-budget', type = float, help = 'maximum estimated memory of the parallel batch jobs in MB')
+    parser.add_argument('--profile', action = 'store_true', help = 'print the time and memory of every stage of each generation')
+    parser.add_argument('--profile-json', help = 'JSON file the profiling reports of the session are saved into')
+    args = parser.parse_args()
+
+    # Headless builds (build/TPMSgen_CLI_headless.spec) do not include PyVista/VTK, so figures are skipped:
+    if importlib.util.find_spec('pyvista') is None:
+        if args.png_dir is not None:
+            parser.error('--png-dir requires PyVista, which is not included in this build')
+        args.no_render = True
+
+    # Imported once the options are parsed, so that --help does not load NumPy:
+    from src import batch, cache, core
+
+    # Rendering of the figures:
+    def render(figure_name):
+        if args.png_dir is not None:
+            os.makedirs(args.png_dir, exist_ok = True)
+            return os.path.join(args.png_dir, figure_name + '.png')
+        return not args.no_render
+
+    mesh_cache = None
+    if args.cache_dir is not None:
+        mesh_cache = cache.mesh_cache(args.cache_dir, args.cache_size)
+
+    # Mesh generation engine (shared by every design of the session):
+    generator = core.tpms_generator(workers = args.workers, replicate_cells = args.replicate_cells, cache = mesh_cache, precision = args.precision, sparse = args.sparse)
+
+    # Profiling reports of the session:
+    profile = args.profile or args.profile_json is not None
+    profile_reports = []
+    def save_profile_reports():
+        if args.profile_json is not None:
+            with open(args.profile_json, 'w') as file:
+                json.dump(profile_reports, file, indent = 4)
+
     active_session = True
+
+    # Batch mode:
+    if args.job is not None:
+        results = batch.fn_run_batch(args.job, args.workers, args.replicate_cells, mesh_cache, parallel_jobs = args.parallel_jobs, memory_budget = args.memory_budget, precision = args.precision, profile = profile, sparse = args.sparse)
+        for result in results:
+            if 'profile' in result:
+                if args.profile:
+                    print('\nProfile of ' + result['file_name'] + ':')
+                    print(core.profile_summary(result['profile']))
+                profile_reports.append(dict(file_name = result['file_name'], **result['profile']))
+        save_profile_reports()
+        active_session = False
+
     while active_session:
         # Selection of TPMS typology:
         input_validator = False
@@ -293,33 +361,39 @@ if __name__ == "__main__":
 
         # Plot TPMS equation:
         mesh = None
-        mesh, vertices = core.fn_plot_tpms_eq(tpms_type, tpms_design, sizes, cell_sizes, origin, unit_cell_mesh_resolution, c, thickness, mesh)
+        mesh, vertices = core.fn_plot_tpms_eq(tpms_type, tpms_design, sizes, cell_sizes, origin, unit_cell_mesh_resolution, c, thickness, mesh, render = render('tpms_equation'), generator = generator, precision = args.precision)
 
-        # Check face normals:
-        mesh = core.fn_check_face_normals(mesh)
+        # Face normals are oriented automatically, so they are only checked and flipped on demand (flipping
+        # them gives the opposite solution):
+        flip_face_normals = args.flip_face_normals
+        if flip_face_normals:
+            mesh = core.fn_flip_face_normals(mesh, render = render('flipped_face_normals'))
+        elif args.check_normals:
+            # Check face normals:
+            mesh = core.fn_check_face_normals(mesh, render = render('face_normals'))
 
-        # Flip face normals:
-        input_validator = False
-        while not input_validator:
-            flip_face_normals = input('Is it necessary to flip face normals? (y/N)')
-            if not flip_face_normals:
-                flip_face_normals = False
-                input_validator = True
-            else:
-                if flip_face_normals != 'n' and flip_face_normals != 'N' and flip_face_normals != 'y' and flip_face_normals != 'Y':
-                    print('Invalid input')
-                elif flip_face_normals == 'n' or flip_face_normals == 'N':
+            # Flip face normals:
+            input_validator = False
+            while not input_validator:
+                flip_face_normals = input('Is it necessary to flip face normals? (y/N)')
+                if not flip_face_normals:
                     flip_face_normals = False
                     input_validator = True
-                elif flip_face_normals == 'y' or flip_face_normals == 'Y':
-                    flip_face_normals = True
-                    mesh = core.fn_flip_face_normals(mesh)
-                    input_validator = True
+                else:
+                    if flip_face_normals != 'n' and flip_face_normals != 'N' and flip_face_normals != 'y' and flip_face_normals != 'Y':
+                        print('Invalid input')
+                    elif flip_face_normals == 'n' or flip_face_normals == 'N':
+                        flip_face_normals = False
+                        input_validator = True
+                    elif flip_face_normals == 'y' or flip_face_normals == 'Y':
+                        flip_face_normals = True
+                        mesh = core.fn_flip_face_normals(mesh, render = render('flipped_face_normals'))
+                        input_validator = True
 
         # Generate mesh
         print('\nMesh generation in progress ...')
-        mesh = core.fn_generate_mesh(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, mesh, flip_face_normals)
-
+        profiler = core.generation_profiler() if profile else None
+        mesh = core.fn_generate_mesh(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, mesh, flip_face_normals, workers = args.workers, replicate_cells = args.replicate_cells, cache = mesh_cache, render = render('mesh'), generator = generator, precision = args.precision, profiler = profiler, sparse = args.sparse)
 
         # Export mesh
         input_validator = False
@@ -342,7 +416,15 @@ if __name__ == "__main__":
             directory_path = input('Enter directory path (default = root folder): ')
             if not directory_path:
                 directory_path = os.getcwd()
-            core.fn_export_stl_file(mesh, file_name, directory_path)
+            core.fn_export_stl_file(mesh, file_name, directory_path, profiler = profiler)
+
+        # Profiling report:
+        if profiler is not None:
+            if args.profile:
+                print('\nProfile of ' + tpms_design + ':')
+                print(profiler.summary())
+            profile_reports.append(dict(tpms_design = tpms_design, **profiler.report()))
+            save_profile_reports()
         
         # Create another design:
         input_validator = False
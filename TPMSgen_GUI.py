@@ -1,23 +1,70 @@
 from src import core
 
+import io
 import os
 import sys
-import trimesh
 
-import numpy as np
 import pyvista as pv
 
-from PyQt5 import uic
-from PyQt5.QtCore import QFileInfo
-from PyQt5.QtWidgets import QMainWindow, QApplication, QMessageBox, QDesktopWidget, QFileDialog, QSizeGrip
-from skimage import measure
+from PyQt5.QtCore import QFileInfo, QThread, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QMainWindow, QApplication, QMessageBox, QDesktopWidget, QFileDialog, QHBoxLayout, QSizeGrip, QWidget
+from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
+from vtkmodules.vtkCommonDataModel import vtkPolyData
+from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
+from vtkmodules.vtkRenderingCore import vtkActor, vtkPolyDataMapper, vtkRenderer
+
+# OpenGL backend of the embedded preview:
+import vtkmodules.vtkRenderingOpenGL2
+
+# Mesh generation worker:
+# Runs the mesh generation of a core.tpms_generator in a background thread, so that the GUI remains
+# responsive. Its progress is reported through signals and it is cancelled with requestInterruption().
+class generation_worker(QThread):
+    progress = pyqtSignal(str, float)
+    generated = pyqtSignal(object, bool)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, generator):
+        super().__init__()
+        self.generator = generator
+
+    def run(self):
+        try:
+            mesh, is_watertight = self.generator.generate(progress = self.report_progress)
+        except core.generation_cancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(str(error))
+        else:
+            self.generated.emit(mesh, is_watertight)
+
+    def report_progress(self, message, fraction):
+        if self.isInterruptionRequested():
+            raise core.generation_cancelled()
+        self.progress.emit(message, fraction)
+
+# Load UI:
+# Frozen builds use the TPMSgen_GUI_ui module compiled from src/TPMSgen_GUI.ui by build/TPMSgen_GUI.spec,
+# so that the UI is not parsed (and uic is not bundled) at startup. Otherwise, the UI embedded below (the
+# same as src/TPMSgen_GUI.ui) is parsed. Widgets are set as attributes of the window in both cases.
+def load_ui(window):
+    if getattr(sys, 'frozen', False):
+        from TPMSgen_GUI_ui import Ui_tpms_generator_gui
+        form = Ui_tpms_generator_gui()
+        form.setupUi(window)
+        for name, widget in vars(form).items():
+            setattr(window, name, widget)
+    else:
+        from PyQt5 import uic
+        uic.loadUi(io.StringIO(ui), window)
 
 # GUI menu functions:
 class gui_menu(QMainWindow):
     def __init__(self):
         super().__init__()
 
-        uic.loadUi('TPMSgen_GUI.ui', self)
+        load_ui(self)
 
         # Initialize variables:
         self.initialize_variables()
@@ -28,6 +75,9 @@ class gui_menu(QMainWindow):
         # Load default values:
         self.load_default_values()
 
+        # Initialize embedded preview:
+        self.initialize_preview()
+
         # TPMS design selector changed:
         self.designs_library.currentRowChanged.connect(self.fn_tpms_selector_changed)
 
@@ -45,6 +95,20 @@ class gui_menu(QMainWindow):
         self.unit_cell_origin_z_input.textChanged.connect(self.reset_visibility)
         self.mesh_resolution_input.textChanged.connect(self.reset_visibility)
 
+        # Preview updated parameters:
+        self.designs_library.currentRowChanged.connect(self.schedule_preview)
+        self.skeletal_c_input.textChanged.connect(self.schedule_preview)
+        self.shell_thickness_input.textChanged.connect(self.schedule_preview)
+        self.bounding_box_x_dim_input.textChanged.connect(self.schedule_preview)
+        self.bounding_box_y_dim_input.textChanged.connect(self.schedule_preview)
+        self.bounding_box_z_dim_input.textChanged.connect(self.schedule_preview)
+        self.unit_cell_x_dim_input.textChanged.connect(self.schedule_preview)
+        self.unit_cell_y_dim_input.textChanged.connect(self.schedule_preview)
+        self.unit_cell_z_dim_input.textChanged.connect(self.schedule_preview)
+        self.unit_cell_origin_x_input.textChanged.connect(self.schedule_preview)
+        self.unit_cell_origin_y_input.textChanged.connect(self.schedule_preview)
+        self.unit_cell_origin_z_input.textChanged.connect(self.schedule_preview)
+
         # Plot TPMS equation button pressed:
         self.plot_tpms_eq_button.clicked.connect(self.fn_plot_tpms_eq)
 
@@ -124,13 +188,15 @@ class gui_menu(QMainWindow):
             # Update output message:
             self.message_output_label.setText('Next step:')
             self.message_output_label.setStyleSheet('color : black')
-            self.message_output.setText('Inspect the generated TPMS\ndesign and check the orientation\nof its face normals.')
+            self.message_output.setText('Inspect the generated TPMS\ndesign and generate the mesh.\nFace normals are oriented\nautomatically, flip them for the\nopposite solution.')
             
             # Plot TPMS equation:
-            self.mesh, self.vertices = core.fn_plot_tpms_eq(self.tpms_type, self.tpms_design, self.sizes, self.cell_sizes, self.origin, self.unit_cell_mesh_resolution, self.c, self.thickness, self.mesh)
+            self.mesh, self.vertices = core.fn_plot_tpms_eq(self.tpms_type, self.tpms_design, self.sizes, self.cell_sizes, self.origin, self.unit_cell_mesh_resolution, self.c, self.thickness, self.mesh, generator = self.generator)
 
-            # Activate check normals button:
+            # Face normals are oriented automatically, so the mesh can be generated right away:
             self.change_visibility(self.check_normals_button, True)
+            self.change_visibility(self.flip_normals_button, True)
+            self.change_visibility(self.generate_mesh_button, True)
 
     def fn_check_face_normals(self):
         # Update output message:
@@ -141,12 +207,6 @@ class gui_menu(QMainWindow):
         # Check face normals:
         self.mesh = core.fn_check_face_normals(self.mesh, True)
 
-        # Activate check normals button:
-        self.change_visibility(self.flip_normals_button, True)
-
-        # Activate flip normals button:
-        self.change_visibility(self.generate_mesh_button, True)
-
     def fn_flip_face_normals(self):
         # Flip face normals
         self.mesh = core.fn_flip_face_normals(self.mesh, True)
@@ -154,6 +214,7 @@ class gui_menu(QMainWindow):
             self.flip_face_normals = False
         else:
             self.flip_face_normals = True
+        self.schedule_preview()
 
         # Update output message:
         self.message_output_label.setText('Next step:')
@@ -167,11 +228,43 @@ class gui_menu(QMainWindow):
         self.change_visibility(self.export_stl_file_button, False)
 
     def fn_generate_mesh(self):
-        # Generate mesh:
-        self.iterative_mesh = core.fn_generate_mesh(self.tpms_type, self.tpms_design, self.c, self.thickness, self.sizes, self.cell_sizes, self.origin, self.unit_cell_mesh_resolution, self.mesh, self.flip_face_normals, True)
+        # Cancel the running generation:
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.change_visibility(self.generate_mesh_button, False)
+            return
+
+        # Generate mesh in a background worker:
+        self.generation_outdated = False
+        self.generator.update(flip_face_normals = self.flip_face_normals)
+        self.worker = generation_worker(self.generator)
+        self.worker.progress.connect(self.fn_generation_progress)
+        self.worker.generated.connect(self.fn_mesh_generated)
+        self.worker.cancelled.connect(self.fn_generation_cancelled)
+        self.worker.failed.connect(self.fn_generation_failed)
+        self.worker.finished.connect(self.fn_generation_finished)
+
+        # Deactivate design buttons while generating:
+        self.generate_mesh_button.setText('Cancel generation')
+        self.change_visibility(self.plot_tpms_eq_button, False)
+        self.change_visibility(self.check_normals_button, False)
+        self.change_visibility(self.flip_normals_button, False)
+        self.change_visibility(self.view_mesh_button, False)
+        self.change_visibility(self.export_stl_file_button, False)
+
+        self.worker.start()
+
+    def fn_generation_progress(self, message, fraction):
+        # Update output message:
+        self.message_output_label.setText('Generating mesh (' + str(int(100 * fraction)) + ' %):')
+        self.message_output_label.setStyleSheet('color : black')
+        self.message_output.setText(message + '...')
+
+    def fn_mesh_generated(self, mesh, is_watertight):
+        self.iterative_mesh = mesh
 
         # Update output message:
-        if self.iterative_mesh.is_watertight:
+        if is_watertight:
             self.message_output_label.setText('Mesh is generated:')
             self.message_output_label.setStyleSheet('color : green')
             self.message_output.setText('The obtained mesh is watertight.\nIf the opposite solution was\ndesired, try flipping face normals.')
@@ -186,13 +279,40 @@ class gui_menu(QMainWindow):
         # Activate check normals button:
         self.change_visibility(self.export_stl_file_button, True)
 
+        # Plot generated mesh:
+        self.fn_view_mesh()
+
+    def fn_generation_cancelled(self):
+        # Update output message (unless the design parameters were changed):
+        if not self.generation_outdated:
+            self.message_output_label.setText('Generation cancelled:')
+            self.message_output_label.setStyleSheet('color : orange')
+            self.message_output.setText('Mesh generation was cancelled.\nChange the design parameters\nor generate the mesh again.')
+
+    def fn_generation_failed(self, error):
+        self.show_warning_messagebox('Mesh generation failed: ' + error)
+
+    def fn_generation_finished(self):
+        self.worker = None
+        self.generate_mesh_button.setText('Generate mesh')
+        self.change_visibility(self.plot_tpms_eq_button, True)
+
+        # Activate design buttons (unless the design parameters were changed):
+        if not self.generation_outdated:
+            self.change_visibility(self.check_normals_button, True)
+            self.change_visibility(self.flip_normals_button, True)
+            self.change_visibility(self.generate_mesh_button, True)
+
+    def closeEvent(self, event):
+        # Stop the running generation before closing:
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.worker.wait()
+        event.accept()
+
     def fn_view_mesh(self):
         # Plot generated mesh:
-        self.plotter = pv.Plotter(window_size = [1400, 1600])
-        _ = self.plotter.add_title('Generated mesh can be exported into STL format', font_size = 10)
-        _ = self.plotter.add_mesh(self.iterative_mesh, color = True, show_edges = True)
-        _ = self.plotter.show_grid()
-        self.plotter.show()
+        core.plot_mesh(self.iterative_mesh, True)
 
     def fn_export_stl_file(self):
         file_path, _ = QFileDialog.getSaveFileName(self, 'Export STL', None, 'STL Files (.stl);;All Files ()')
@@ -202,10 +322,87 @@ class gui_menu(QMainWindow):
             if len(suffix) > 0 and suffix != '.stl':
                 self.show_warning_messagebox('Incorrect file format for exporting the generated mesh.')
             else:
-                file_path += '.stl'
-                export = trimesh.exchange.stl.export_stl_ascii(self.iterative_mesh)
-                with open(file_path, 'w') as file:
-                    file.write(export)
+                core.fn_export_stl_file(self.iterative_mesh, os.path.basename(file_path), os.path.dirname(file_path), silent = True)
+
+    def initialize_preview(self):
+        # Embedded VTK view next to the design configurator:
+        self.preview_widget = QVTKRenderWindowInteractor()
+        self.preview_widget.setMinimumWidth(400)
+        self.preview_renderer = vtkRenderer()
+        self.preview_renderer.SetBackground(1, 1, 1)
+        self.preview_widget.GetRenderWindow().AddRenderer(self.preview_renderer)
+        self.preview_widget.GetRenderWindow().GetInteractor().SetInteractorStyle(vtkInteractorStyleTrackballCamera())
+
+        self.preview_mapper = vtkPolyDataMapper()
+        self.preview_actor = vtkActor()
+        self.preview_actor.SetMapper(self.preview_mapper)
+        self.preview_actor.GetProperty().SetColor(0.6, 0.75, 0.9)
+        self.preview_renderer.AddActor(self.preview_actor)
+
+        # The designed central widget is taken (not deleted) and placed beside the preview:
+        central_widget = self.takeCentralWidget()
+        container = QWidget()
+        layout = QHBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(central_widget)
+        layout.addWidget(self.preview_widget, 1)
+        self.setCentralWidget(container)
+        self.resize(self.width() + 500, self.height())
+
+        self.preview_widget.Initialize()
+        self.preview_widget.Start()
+
+        # Previews are updated once the parameters stop changing:
+        self.preview_timer = QTimer()
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(250)
+        self.preview_timer.timeout.connect(self.fn_update_preview)
+
+        self.preview_camera_reset = False
+        self.fn_update_preview()
+
+    def schedule_preview(self):
+        self.preview_timer.start()
+
+    def fn_update_preview(self):
+        parameters = self.read_preview_parameters()
+        if parameters is None:
+            return
+
+        # Low resolution mesh (computed in a fraction of a second):
+        self.preview_generator.update(**parameters)
+        preview = self.preview_generator.preview()
+        if len(preview.faces) > 0:
+            self.preview_mapper.SetInputData(pv.wrap(preview))
+        else:
+            self.preview_mapper.SetInputData(vtkPolyData())
+
+        if not self.preview_camera_reset:
+            self.preview_renderer.ResetCamera()
+            self.preview_camera_reset = True
+        self.preview_widget.GetRenderWindow().Render()
+
+    def read_preview_parameters(self):
+        # Parameters being edited may not be valid yet, in which case the preview is not updated:
+        try:
+            sizes = [float(self.bounding_box_x_dim_input.text()), float(self.bounding_box_y_dim_input.text()), float(self.bounding_box_z_dim_input.text())]
+            cell_sizes = [float(self.unit_cell_x_dim_input.text()), float(self.unit_cell_y_dim_input.text()), float(self.unit_cell_z_dim_input.text())]
+            origin = [float(self.unit_cell_origin_x_input.text()), float(self.unit_cell_origin_y_input.text()), float(self.unit_cell_origin_z_input.text())]
+            if self.tpms_type == 'Shell':
+                c = 0
+                thickness = float(self.shell_thickness_input.text())
+            else:
+                c = float(self.skeletal_c_input.text())
+                thickness = None
+        except ValueError:
+            return None
+
+        if any(not (0 < cell_sizes[i] <= sizes[i]) for i in range(3)):
+            return None
+        if self.tpms_type == 'Shell' and not thickness > 0:
+            return None
+
+        return {'tpms_type': self.tpms_type, 'tpms_design': self.tpms_design, 'c': c, 'thickness': thickness, 'sizes': sizes, 'cell_sizes': cell_sizes, 'origin': origin, 'flip_face_normals': self.flip_face_normals}
 
     def change_visibility(self, variable, state):
         variable.setEnabled(state)
@@ -286,37 +483,25 @@ class gui_menu(QMainWindow):
                 self.show_warning_messagebox('Please, check unit cell mesh resolution value (minimum 20, type int.).')
                 self.are_warnings = True
 
-    def generate_meshgrid(self, k):
-        tol_x = k * self.cell_sizes[0] / self.unit_cell_mesh_resolution
-        tol_y = k * self.cell_sizes[1] / self.unit_cell_mesh_resolution
-        tol_z = k * self.cell_sizes[2] / self.unit_cell_mesh_resolution
-        tols = [tol_x, tol_y, tol_z]
-
-        xl = np.linspace(-self.sizes[0]/2 - tols[0], self.sizes[0]/2 + tols[0], int(self.sizes[0] / self.cell_sizes[0]) * self.unit_cell_mesh_resolution + 2 * k + 1)
-        yl = np.linspace(-self.sizes[1]/2 - tols[1], self.sizes[1]/2 + tols[1], int(self.sizes[1] / self.cell_sizes[1]) * self.unit_cell_mesh_resolution + 2 * k + 1)
-        zl = np.linspace(-self.sizes[2]/2 - tols[2], self.sizes[2]/2 + tols[2], int(self.sizes[2] / self.cell_sizes[2]) * self.unit_cell_mesh_resolution + 2 * k + 1)
-        spacing = [xl, yl, zl]
-        
-        Y, X, Z = np.meshgrid(yl, xl, zl)
-
-        return X, Y, Z, tols, spacing  
-
     def initialize_variables(self):
         self.are_warnings = None
         self.c = None
         self.cell_sizes = None
         self.flip_face_normals = False
+        self.generation_outdated = False
+        self.generator = core.tpms_generator()
         self.iterative_mesh = None
         self.mesh = None
         self.origin = None
+        self.preview_generator = core.tpms_generator()
         self.sizes = None
-        self.t = None
         self.thickness = None
         self.tpms_library_items = None
         self.tpms_type = None
         self.tpms_design = None
         self.unit_cell_mesh_resolution = None
         self.vertices = None
+        self.worker = None
 
     def load_default_values(self):
         # Initialize Skeletal-TPMS designs library:
@@ -361,54 +546,12 @@ class gui_menu(QMainWindow):
         self.message_output_label.setStyleSheet('color : black')
         self.message_output.setText('Set your design parameters and\nplot the equation of the choosen \nTPMS typology.')
 
-    def mesh_conversion(self, mesh_pv):
-        faces_as_array = mesh_pv.faces.reshape((mesh_pv.n_faces, 4))[:, 1:]
-        mesh = trimesh.Trimesh(mesh_pv.points, faces_as_array)
-
-        return mesh
-
-    def mesh_shell(self, F, mesh, tols, spacing):
-        vertices_positive, faces_positive, vertex_normals_positive, _ = measure.marching_cubes(F, self.thickness * self.t, spacing = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]])
-        vertices_negative, faces_negative, vertex_normals_negative, _ = measure.marching_cubes(F, -self.thickness * self.t, spacing = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]])
-
-        for i, vert in enumerate(vertices_positive):
-            vertices_positive[i, 0] = vert[0] - self.sizes[0]/2 - tols[0]
-            vertices_positive[i, 1] = vert[1] - self.sizes[1]/2 - tols[1]
-            vertices_positive[i, 2] = vert[2] - self.sizes[2]/2 - tols[2]
-
-        for i, vert in enumerate(vertices_negative):
-            vertices_negative[i, 0] = vert[0] - self.sizes[0]/2 - tols[0]
-            vertices_negative[i, 1] = vert[1] - self.sizes[1]/2 - tols[1]
-            vertices_negative[i, 2] = vert[2] - self.sizes[2]/2 - tols[2]
-
-        vertices = np.concatenate((vertices_positive, vertices_negative))
-        
-        mesh_1 = trimesh.Trimesh(vertices = vertices_positive, faces = faces_positive, vertex_normals = vertex_normals_positive)
-        mesh_2 = trimesh.Trimesh(vertices = vertices_negative, faces = faces_negative, vertex_normals = vertex_normals_negative)
-        mesh_2 = pv.wrap(mesh_2)
-        mesh_2.flip_normals()
-        mesh_2 = self.mesh_conversion(mesh_2)
-
-        mesh = trimesh.util.concatenate((mesh_1, mesh_2))
-        
-        del vertices_positive, faces_positive, vertex_normals_positive, vertices_negative, faces_negative, vertex_normals_negative, mesh_1, mesh_2
-
-        return mesh, vertices
-
-    def mesh_skeletal(self, F, mesh, tols, spacing):
-        vertices, faces, _, _ = measure.marching_cubes(F, 0, spacing = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]])
-        for i, vert in enumerate(vertices):
-            vertices[i, 0] = vert[0] - self.sizes[0]/2 - tols[0]
-            vertices[i, 1] = vert[1] - self.sizes[1]/2 - tols[1]
-            vertices[i, 2] = vert[2] - self.sizes[2]/2 - tols[2]
-        
-        mesh = trimesh.Trimesh(vertices = vertices, faces = faces)
-
-        del faces
-
-        return mesh, vertices
-
     def reset_visibility(self):
+        # Changed design parameters cancel the running generation:
+        if self.worker is not None:
+            self.generation_outdated = True
+            self.worker.requestInterruption()
+
         self.check_normals_button.setEnabled(False)
         self.flip_normals_button.setEnabled(False)
         self.generate_mesh_button.setEnabled(False)
@@ -442,47 +585,6 @@ class gui_menu(QMainWindow):
         # Show message box
         retval = msg.exec_()
 
-    def tpms_library(self, X, Y, Z):
-        w_x = 1 / self.cell_sizes[0] * 2 * np.pi
-        w_y = 1 / self.cell_sizes[1] * 2 * np.pi
-        w_z = 1 / self.cell_sizes[2] * 2 * np.pi
-        
-        if self.tpms_design == 'Skeletal-TPMS Schoen gyroid' or self.tpms_design == 'Shell-TPMS Gyroid':
-            F = (np.cos(w_x * (X + self.origin[0])) * np.sin(w_y * (Y + self.origin[1])) + np.cos(w_y * (Y + self.origin[1])) * np.sin(w_z * (Z + self.origin[2])) + np.cos(w_z * (Z + self.origin[2])) * np.sin(w_x * (X + self.origin[0])) - self.c)   # J
-            self.t = 0.125
-        
-        elif self.tpms_design == 'Skeletal-TPMS Schwarz diamond':
-            F = (np.cos(w_x * (X + self.origin[0])) * np.cos(w_y * (Y + self.origin[1])) * np.cos(w_z * (Z + self.origin[2])) + np.sin(w_x * (X + self.origin[0])) * np.sin(w_y * (Y + self.origin[1])) * np.sin(w_z * (Z + self.origin[2])) - self.c)   # K
-        
-        elif self.tpms_design == 'Skeletal-TPMS Schwarz primitive (pinched)' or self.tpms_design == 'Skeletal-TPMS Schwarz primitive':
-            F = (np.cos(w_x * (X + self.origin[0])) + np.cos(w_y * (Y + self.origin[1])) + np.cos(w_z * (Z + self.origin[2])) - self.c)   # M, N
-        
-        elif self.tpms_design == 'Skeletal-TPMS Body diagonals with nodes':
-            F = (2 * (np.cos(w_x * ((X + self.origin[0]))) * np.cos(w_y * (Y + self.origin[1])) + np.cos(w_y * (Y + self.origin[1])) * np.cos(w_z * (Z + self.origin[2])) + np.cos(w_z * (Z + self.origin[2])) * np.cos(w_x * (X + self.origin[0]))) - (np.cos(2 * w_x * (X + self.origin[0])) + np.cos(2 * w_y * (Y + self.origin[1])) + np.cos(2 * w_z * (Z + self.origin[2]))) - self.c) # O
-        
-        elif self.tpms_design == 'Shell-TPMS Diamond':
-            F = (np.sin(w_x * (X + self.origin[0])) * np.sin(w_y * (Y + self.origin[1])) * np.sin(w_z * (Z + self.origin[2])) + np.sin(w_x * (X + self.origin[0])) * np.cos(w_y * (Y + self.origin[1])) * np.cos(w_z * (Z + self.origin[2])) + np.cos(w_x * (X + self.origin[0])) * np.sin(w_y * (Y + self.origin[1])) * np.cos(w_z * (Z + self.origin[2])) + np.cos(w_x * (X + self.origin[0])) * np.cos(w_y * (Y + self.origin[1])) * np.sin(w_z * (Z + self.origin[2])) - self.c) # Q
-            self.t = 0.115
-        
-        elif self.tpms_design == 'Shell-TPMS Lidinoid':
-            F = (np.sin(2 * w_x * (X + self.origin[0])) * np.cos(w_y * (Y + self.origin[1])) * np.sin(w_z * (Z + self.origin[2])) + np.sin(w_x * (X + self.origin[0])) * np.sin(2 * w_y * (Y + self.origin[1])) * np.cos(w_z * (Z + self.origin[2])) + np.cos(w_x * (X + self.origin[0])) * np.sin(w_y * (Y + self.origin[1])) * np.sin(2 * w_z * (Z + self.origin[2])) - np.cos(2 * w_x * (X + self.origin[0])) * np.cos(2 * w_y * (Y + self.origin[1])) - np.cos(2 * w_y * (Y + self.origin[1])) * np.cos(2 * w_z * (Z + self.origin[2])) - np.cos(2 * w_z * (Z + self.origin[2])) * np.cos(2 * w_x * (X + self.origin[0])) + 0.3 - self.c)
-            self.t = 0.37
-        
-        elif self.tpms_design == 'Shell-TPMS Split-P':
-            F = (1.1 * (np.sin(2 * w_x * (X + self.origin[0])) * np.cos(w_y * (Y + self.origin[1])) * np.sin(w_z * (Z + self.origin[2])) + np.sin(w_x * (X + self.origin[0])) * np.sin(2 * w_y * (Y + self.origin[1])) * np.cos(w_z * (Z + self.origin[2])) + np.cos(w_x * (X + self.origin[0])) * np.sin(w_y * (Y + self.origin[1])) * np.sin(2 * w_z * (Z + self.origin[2]))) - 0.2 * (np.cos(2 * w_x * (X + self.origin[0])) * np.cos(2 * w_y * (Y + self.origin[1])) + np.cos(2 * w_y * (Y + self.origin[1])) * np.cos(2 * w_z * (Z + self.origin[2])) + np.cos(2 * w_z * (Z + self.origin[2])) * np.cos(2 * w_x * (X + self.origin[0]))) - 0.4 * (np.cos(2 * w_x * (X + self.origin[0])) + np.cos(2 * w_y * (Y + self.origin[1])) + np.cos(2 * w_z * (Z + self.origin[2]))) - self.c)
-            self.t = 0.19
-        
-        elif self.tpms_design == 'Shell-TPMS Schwarz':
-            F = (np.cos(w_x * (X + self.origin[0])) + np.cos(w_y * (Y + self.origin[1])) + np.cos(w_z * (Z + self.origin[2])) - self.c)
-            self.t = 0.0875
-        
-        else:
-            print('Design not found in library')
-            F = 0
-            self.t = 0
-
-        return F
-
 if __name__ == "__main__":
     # ui
     ui = '''<?xml version="1.0" encoding="UTF-8"?>
@@ -1329,11 +1431,13 @@ if __name__ == "__main__":
 </ui>
     '''
 
-    with open('TPMSgen_GUI.ui', 'w') as file:
-        file.write(ui)
-
     app = QApplication(sys.argv)
     GUI = gui_menu()
     GUI.move(800, int((QDesktopWidget().screenGeometry().height() - GUI.height()) / 2))
     GUI.show()
+
+    # Startup time measurement (benchmarks/frozen_builds.py):
+    if '--quit-after-startup' in sys.argv:
+        QTimer.singleShot(0, app.quit)
+
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,82 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import core
+
+# Legacy evaluation on the full meshgrid (every operation allocates a full-size temporary):
+def library_field(spacing, c, tpms_design, cell_sizes, origin, dtype):
+    Y, X, Z = np.meshgrid(spacing[1], spacing[0], spacing[2])
+    F, _ = core.tpms_library(X, Y, Z, c, tpms_design, cell_sizes, origin)
+
+    return F
+
+def backend_field(backend):
+    def evaluate(spacing, c, tpms_design, cell_sizes, origin, dtype):
+        F, _ = core.tpms_field(spacing, c, tpms_design, cell_sizes, origin, dtype, backend = backend)
+        return F
+
+    return evaluate
+
+def best_time(function, arguments, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*arguments)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+# Full-size temporaries: peak memory allocated by NumPy beyond F, in units of F
+# (allocations made inside the accelerators themselves are not traced, and they do not allocate grids):
+def temporaries(function, arguments):
+    tracemalloc.start()
+    F = function(*arguments)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return (peak - F.nbytes) / F.nbytes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Per-design speed and temporaries of the TPMS field backends')
+    parser.add_argument('--resolution', type = int, default = 120, help = 'unit cell mesh resolution (default = 120)')
+    parser.add_argument('--cells', type = int, default = 1, help = 'unit cells per axis (default = 1)')
+    parser.add_argument('--precision', default = 'float64', help = 'field precision (default = float64)')
+    parser.add_argument('--repeats', type = int, default = 3, help = 'repetitions of every timing (default = 3)')
+    args = parser.parse_args()
+
+    cell_sizes = [10, 10, 10]
+    sizes = [args.cells * cell_size for cell_size in cell_sizes]
+    _, spacing = core.generate_axes(0, sizes, cell_sizes, args.resolution)
+
+    functions = {'library': library_field}
+    for backend in core.FIELD_BACKENDS:
+        try:
+            core.field_kernel(backend)
+        except ImportError:
+            print('Backend not installed: ' + backend)
+            continue
+        functions[backend] = backend_field(backend)
+
+    print('Grid: ' + 'x'.join(str(len(axis)) for axis in spacing) + ' nodes, ' + args.precision)
+    print('{:42s}'.format('design') + ''.join('{:>10s} [s]'.format(name) for name in functions) + ''.join('{:>12s}'.format(name + ' x') for name in functions if name not in ('library', 'numpy')))
+    for tpms_design in core.TPMS_DESIGNS:
+        arguments = (spacing, 0.2, tpms_design, cell_sizes, [0, 0, 0], args.precision)
+
+        # First call compiles the numba kernel:
+        for function in functions.values():
+            function(*arguments)
+
+        timings = {name: best_time(function, arguments, args.repeats) for name, function in functions.items()}
+        speedups = [timings['numpy'] / timings[name] for name in functions if name not in ('library', 'numpy')]
+        print('{:42s}'.format(tpms_design) + ''.join('{:14.4f}'.format(timing) for timing in timings.values()) + ''.join('{:11.1f}x'.format(speedup) for speedup in speedups))
+
+    print('\nFull-size temporaries (peak memory beyond F, in units of F):')
+    for tpms_design in ['Shell-TPMS Gyroid', 'Shell-TPMS Split-P']:
+        arguments = (spacing, 0.2, tpms_design, cell_sizes, [0, 0, 0], args.precision)
+        print('{:42s}'.format(tpms_design) + ''.join('{:>10s} {:4.1f}'.format(name, temporaries(function, arguments)) for name, function in functions.items()))
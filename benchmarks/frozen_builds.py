@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+# Small batch job, run to time the startup of a whole generation:
+JOB = {
+    'tpms_design': 'Shell-TPMS Gyroid',
+    'thickness': 1,
+    'sizes': [10, 10, 10],
+    'cell_sizes': [10, 10, 10],
+    'unit_cell_mesh_resolution': 20}
+
+# Bundle size (in MB): the executable of a one-file build or the directory of a one-folder build (without
+# counting symbolic links twice):
+def bundle_size(executable):
+    if os.path.isdir(os.path.join(os.path.dirname(executable), '_internal')):
+        size = 0
+        for directory, _, file_names in os.walk(os.path.dirname(executable)):
+            size += sum(os.lstat(os.path.join(directory, file_name)).st_size for file_name in file_names)
+        return size / 1024**2
+
+    return os.path.getsize(executable) / 1024**2
+
+# Best time of several runs (in s):
+def best_time(command, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL, check = True)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+# Startup timings of a build:
+# CLI builds are timed with --help and with a small batch job, GUI builds until their window is shown.
+def measure_build(executable, repeats):
+    result = {'executable': executable, 'bundle_mb': bundle_size(executable)}
+    if 'GUI' in os.path.basename(executable):
+        result['startup'] = best_time([executable, '--quit-after-startup'], repeats)
+        return result
+
+    result['help'] = best_time([executable, '--help'], repeats)
+    with tempfile.TemporaryDirectory() as directory:
+        job_file = os.path.join(directory, 'job.json')
+        with open(job_file, 'w') as file:
+            json.dump(dict(JOB, output_directory = directory), file)
+        result['batch_job'] = best_time([executable, '--job', job_file], repeats)
+
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Bundle size and startup time of frozen TPMSgen builds (see build/*.spec)')
+    parser.add_argument('executables', nargs = '+', help = 'executables of the builds (e.g. dist/TPMSgen_CLI_headless/TPMSgen_CLI_headless)')
+    parser.add_argument('--repeats', type = int, default = 3, help = 'repetitions of every timing (default = 3)')
+    parser.add_argument('--output', help = 'JSON file the results are saved into')
+    args = parser.parse_args()
+
+    results = []
+    print('{:40s} {:>12s} {:>10s} {:>14s} {:>14s}'.format('build', 'size [MB]', 'help [s]', 'batch job [s]', 'startup [s]'))
+    for executable in args.executables:
+        result = measure_build(os.path.abspath(executable), args.repeats)
+        results.append(result)
+        timings = [format(result[name], '.2f') if name in result else '-' for name in ('help', 'batch_job', 'startup')]
+        print('{:40s} {:12.1f} {:>10s} {:>14s} {:>14s}'.format(os.path.basename(executable), result['bundle_mb'], *timings))
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent = 4)
+        print('\nResults saved into ' + args.output)
@@ -0,0 +1,166 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import __version__, core
+
+STAGES = ['meshgrid', 'library', 'field', 'surface', 'generate', 'export']
+RESOLUTIONS = [20, 40, 60, 80, 100, 120]
+CELL_SIZES = [10, 10, 10]
+
+# Design parameters of every benchmark (1 mm thick shells, c = 0 skeletals):
+def design_parameters(tpms_design):
+    if tpms_design.startswith('Shell'):
+        return 'Shell', 0, 1
+    return 'Skeletal', 0, 0
+
+# Stage function
+# Returns the function timed for a stage and its arguments, whose set-up is not timed:
+def stage_function(stage, tpms_design, unit_cell_mesh_resolution, sizes, directory):
+    tpms_type, c, thickness = design_parameters(tpms_design)
+    origin = [0, 0, 0]
+
+    if stage == 'meshgrid':
+        return core.generate_meshgrid, (0, sizes, CELL_SIZES, unit_cell_mesh_resolution)
+
+    if stage == 'library':
+        X, Y, Z, _, _ = core.generate_meshgrid(0, sizes, CELL_SIZES, unit_cell_mesh_resolution)
+        return core.tpms_library, (X, Y, Z, c, tpms_design, CELL_SIZES, origin)
+
+    tols, spacing = core.generate_axes(0, sizes, CELL_SIZES, unit_cell_mesh_resolution)
+    if stage == 'field':
+        return core.tpms_field, (spacing, c, tpms_design, CELL_SIZES, origin)
+
+    if stage == 'surface':
+        F, t = core.tpms_field(spacing, c, tpms_design, CELL_SIZES, origin)
+        if tpms_type == 'Shell':
+            return core.mesh_shell, (F, t, thickness, sizes, None, tols, spacing)
+        return core.mesh_skeletal, (F, sizes, None, tols, spacing)
+
+    if stage == 'generate':
+        return core.generate_mesh, (tpms_type, tpms_design, c, thickness, sizes, CELL_SIZES, origin, unit_cell_mesh_resolution, False, True)
+
+    if stage == 'export':
+        mesh, _ = core.generate_mesh(tpms_type, tpms_design, c, thickness, sizes, CELL_SIZES, origin, unit_cell_mesh_resolution, False, True)
+        return core.fn_export_stl_file, (mesh, 'benchmark', directory, True)
+
+    raise ValueError('Unknown stage: ' + stage)
+
+# Best time of several calls (in s):
+# An untimed warm-up call first loads the lazily imported modules (trimesh, scikit-image...), so that
+# their import is not timed even with a single repeat.
+def best_time(function, arguments, repeats):
+    function(*arguments)
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*arguments)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+# Peak memory allocated by a call (in MB), traced in a separate call so that it does not slow the timings:
+def peak_memory(function, arguments):
+    tracemalloc.start()
+    function(*arguments)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return peak / 1024**2
+
+def run_suite(stages, designs, resolutions, cells, repeats):
+    sizes = [cells * cell_size for cell_size in CELL_SIZES]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for stage in stages:
+            for tpms_design in designs:
+                for unit_cell_mesh_resolution in resolutions:
+                    function, arguments = stage_function(stage, tpms_design, unit_cell_mesh_resolution, sizes, directory)
+                    result = {
+                        'stage': stage,
+                        'design': tpms_design,
+                        'resolution': unit_cell_mesh_resolution,
+                        'time': best_time(function, arguments, repeats),
+                        'peak_memory': peak_memory(function, arguments)}
+                    results.append(result)
+                    print('{:10s} {:42s} {:5d} {:10.4f} s {:10.1f} MB'.format(stage, tpms_design, unit_cell_mesh_resolution, result['time'], result['peak_memory']))
+                    del function, arguments
+
+    return results
+
+def metadata(cells, repeats):
+    return {
+        'date': datetime.datetime.now().isoformat(timespec = 'seconds'),
+        'version': __version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'field_backend': core.field_backend_name(core.FIELD_BACKEND),
+        'cells': cells,
+        'repeats': repeats}
+
+# Compare results
+# A result regresses when its time grows more than time_tolerance (and more than min_time seconds, to
+# ignore the noise of very short timings) or its peak memory grows more than memory_tolerance.
+def compare_results(results, baseline, time_tolerance, memory_tolerance, min_time):
+    baseline_results = {(result['stage'], result['design'], result['resolution']): result for result in baseline['results']}
+
+    regressions = []
+    compared = 0
+    for result in results:
+        reference = baseline_results.get((result['stage'], result['design'], result['resolution']))
+        if reference is None:
+            continue
+        compared += 1
+
+        time_ratio = result['time'] / reference['time'] if reference['time'] > 0 else 1
+        memory_ratio = result['peak_memory'] / reference['peak_memory'] if reference['peak_memory'] > 0 else 1
+        slower = time_ratio > 1 + time_tolerance and result['time'] - reference['time'] > min_time
+        larger = memory_ratio > 1 + memory_tolerance
+        if slower or larger:
+            regressions.append((result, time_ratio, memory_ratio))
+
+    print('\n' + str(compared) + ' results compared with the baseline (' + baseline['metadata']['date'] + ')')
+    for result, time_ratio, memory_ratio in regressions:
+        print('REGRESSION {:10s} {:42s} {:5d}   time x{:.2f}   memory x{:.2f}'.format(result['stage'], result['design'], result['resolution'], time_ratio, memory_ratio))
+
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Time and peak memory of every stage of the TPMSgen pipeline')
+    parser.add_argument('--stages', nargs = '+', choices = STAGES, default = STAGES, help = 'stages to benchmark (default = all)')
+    parser.add_argument('--designs', nargs = '+', choices = list(core.TPMS_DESIGNS), default = list(core.TPMS_DESIGNS), metavar = 'DESIGN', help = 'designs to benchmark (default = all)')
+    parser.add_argument('--resolutions', nargs = '+', type = int, default = RESOLUTIONS, help = 'unit cell mesh resolutions (default = 20 40 60 80 100 120)')
+    parser.add_argument('--cells', type = int, default = 1, help = 'unit cells per axis (default = 1)')
+    parser.add_argument('--repeats', type = int, default = 3, help = 'repetitions of every timing (default = 3)')
+    parser.add_argument('--output', help = 'JSON file the results are saved into')
+    parser.add_argument('--baseline', help = 'JSON results to compare with (exit status 1 on regressions)')
+    parser.add_argument('--time-tolerance', type = float, default = 0.2, help = 'allowed relative time increase (default = 0.2)')
+    parser.add_argument('--memory-tolerance', type = float, default = 0.1, help = 'allowed relative peak memory increase (default = 0.1)')
+    parser.add_argument('--min-time', type = float, default = 0.005, help = 'time increases below this many seconds are ignored (default = 0.005)')
+    args = parser.parse_args()
+
+    results = run_suite(args.stages, args.designs, args.resolutions, args.cells, args.repeats)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump({'metadata': metadata(args.cells, args.repeats), 'results': results}, file, indent = 4)
+        print('\nResults saved into ' + args.output)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        if compare_results(results, baseline, args.time_tolerance, args.memory_tolerance, args.min_time):
+            sys.exit(1)
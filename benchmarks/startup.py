@@ -0,0 +1,56 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Startup commands (a new interpreter every time) and their targets (in s):
+COMMANDS = {
+    'import src.core': ([sys.executable, '-c', 'import src.core'], 0.5),
+    'import src.batch': ([sys.executable, '-c', 'import src.batch'], 0.5),
+    'TPMSgen_CLI.py --help': ([sys.executable, os.path.join(ROOT, 'TPMSgen_CLI.py'), '--help'], 0.3)}
+
+# Modules that are only loaded when they are used (VTK only when a figure is rendered):
+DEFERRED_MODULES = ['trimesh', 'skimage', 'scipy', 'pyvista', 'vtkmodules']
+
+# Best time of several runs (in s):
+def best_time(command, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd = ROOT, stdout = subprocess.DEVNULL, check = True)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+# Deferred modules loaded by importing the package:
+def loaded_modules():
+    code = 'import sys, src.batch, src.cache, src.core; print(" ".join(sorted({name.split(".")[0] for name in sys.modules})))'
+    output = subprocess.run([sys.executable, '-c', code], cwd = ROOT, stdout = subprocess.PIPE, check = True, text = True).stdout
+
+    return [name for name in DEFERRED_MODULES if name in output.split()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Startup time of the TPMSgen modules and CLI')
+    parser.add_argument('--repeats', type = int, default = 5, help = 'repetitions of every timing (default = 5)')
+    parser.add_argument('--scale', type = float, default = 1, help = 'factor applied to the targets, e.g. on slow machines (default = 1)')
+    args = parser.parse_args()
+
+    failed = False
+    interpreter = best_time([sys.executable, '-c', 'pass'], args.repeats)
+    print('{:25s} {:10.3f} s'.format('python -c pass', interpreter))
+    for name, (command, target) in COMMANDS.items():
+        timing = best_time(command, args.repeats)
+        status = 'OK' if timing <= target * args.scale else 'SLOW'
+        failed = failed or status == 'SLOW'
+        print('{:25s} {:10.3f} s   target {:.2f} s   {}'.format(name, timing, target * args.scale, status))
+
+    modules = loaded_modules()
+    if modules:
+        failed = True
+        print('Modules loaded on import: ' + ', '.join(modules))
+
+    if failed:
+        sys.exit(1)
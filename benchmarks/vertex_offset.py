@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+from skimage import measure
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import core
+
+# Per-vertex loop formerly used by mesh_shell and mesh_skeletal:
+def offset_loop(vertices, sizes, tols):
+    for i, vert in enumerate(vertices):
+        vertices[i, 0] = vert[0] - sizes[0]/2 - tols[0]
+        vertices[i, 1] = vert[1] - sizes[1]/2 - tols[1]
+        vertices[i, 2] = vert[2] - sizes[2]/2 - tols[2]
+
+    return vertices
+
+# Vectorized offset:
+def offset_vectorized(vertices, sizes, tols):
+    vertices -= core.vertex_offset(sizes, tols)
+
+    return vertices
+
+def best_time(function, vertices, sizes, tols, repeats):
+    timings = []
+    for _ in range(repeats):
+        vertices_copy = vertices.copy()
+        start = time.perf_counter()
+        function(vertices_copy, sizes, tols)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+if __name__ == "__main__":
+    sizes = [40, 40, 40]
+    cell_sizes = [20, 20, 20]
+    origin = [0, 0, 0]
+
+    print('resolution   vertices        loop [s]  vectorized [s]    speedup')
+    for unit_cell_mesh_resolution in [20, 40, 60, 80, 100, 120, 150]:
+        tols, spacing = core.generate_axes(1, sizes, cell_sizes, unit_cell_mesh_resolution)
+        F, t = core.tpms_field(spacing, 0, 'Skeletal-TPMS Schoen gyroid', cell_sizes, origin)
+        vertices, _, _, _ = measure.marching_cubes(F, 0, spacing = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]])
+
+        # Both implementations must agree:
+        expected = offset_loop(vertices.copy(), sizes, tols)
+        assert np.allclose(expected, offset_vectorized(vertices.copy(), sizes, tols))
+
+        time_loop = best_time(offset_loop, vertices, sizes, tols, 1)
+        time_vectorized = best_time(offset_vectorized, vertices, sizes, tols, 5)
+        print('{:10d} {:10d} {:15.4f} {:15.6f} {:9.0f}x'.format(unit_cell_mesh_resolution, len(vertices), time_loop, time_vectorized, time_loop / time_vectorized))
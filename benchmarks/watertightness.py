@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import core
+
+SIZES = [40, 40, 40]
+CELL_SIZES = [10, 10, 10]
+
+# Designs whose field is zero (or rounds to zero in float32) on grid nodes, some of them on brick seams
+# and unit cell boundaries: tpms_type, tpms_design, c, thickness and unit cell mesh resolution.
+CASES = [
+    ('Skeletal', 'Skeletal-TPMS Schwarz diamond', 0.5, 0, 24),
+    ('Skeletal', 'Skeletal-TPMS Schwarz diamond', 0.6830127018922194, 0, 24),
+    ('Skeletal', 'Skeletal-TPMS Schwarz primitive', -1, 0, 20),
+    ('Skeletal', 'Skeletal-TPMS Schwarz primitive', 0.5, 0, 20),
+    ('Shell', 'Shell-TPMS Gyroid', 0, 1, 24)]
+
+# Mesh generation options (single brick, brick split, replicated unit cells and sparse marching cubes):
+OPTIONS = {
+    'single brick': {},
+    'bricks': {'tile_budget': 1},
+    'replicate_cells': {'replicate_cells': True},
+    'sparse': {'sparse': True}}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Watertightness of the native engine on fields with zero nodes')
+    parser.add_argument('--precision', nargs = '+', default = ['float64', 'float32'], help = 'field precisions (default = float64 float32)')
+    args = parser.parse_args()
+
+    # Meshed by mesh_clipped_tpms, so that no reduced precision falls back to float64:
+    failed = False
+    for tpms_type, tpms_design, c, thickness, unit_cell_mesh_resolution in CASES:
+        for precision in args.precision:
+            for name, options in OPTIONS.items():
+                mesh = core.mesh_clipped_tpms(tpms_type, tpms_design, c, thickness, SIZES, CELL_SIZES, [0, 0, 0], unit_cell_mesh_resolution, False, precision = precision, **options)
+                status = 'OK' if mesh.is_watertight else 'NOT watertight'
+                failed = failed or not mesh.is_watertight
+                print('{:35s} c = {:<20} r = {:3d}  {:8s} {:16s} {}'.format(tpms_design, c, unit_cell_mesh_resolution, precision, name, status))
+
+    if failed:
+        sys.exit(1)
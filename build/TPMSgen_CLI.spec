@@ -1,26 +1,24 @@
 # -*- mode: python ; coding: utf-8 -*-
+import sys
+
+sys.path.insert(0, SPECPATH)
+from frozen_modules import EXCLUDES, VTK_MODULES
 
 
 block_cipher = None
 
 
+# Only the VTK modules of the PyVista figures (see frozen_modules.py), and no Qt:
 a = Analysis(
     ['../TPMSgen_CLI.py'],
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[
-    	    'vtkmodules',
-	    'vtkmodules.all',
-	    'vtkmodules.qt.QVTKRenderWindowInteractor',
-	    'vtkmodules.util',
-	    'vtkmodules.util.numpy_support',
-	    'vtkmodules.numpy_interface.dataset_adapter',
-	   ],
+    hiddenimports=VTK_MODULES,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUDES + ['PyQt5'],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -28,6 +26,7 @@ a = Analysis(
 )
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
+# One-folder build without UPX, so that nothing is extracted or decompressed at every launch:
 exe = EXE(
     pyz,
     a.scripts,
@@ -37,7 +36,7 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -51,7 +50,7 @@ coll = COLLECT(
     a.zipfiles,
     a.datas,
     strip=False,
-    upx=True,
+    upx=False,
     upx_exclude=[],
     name='TPMSgen_CLI',
 )
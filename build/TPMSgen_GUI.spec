@@ -1,26 +1,33 @@
 # -*- mode: python ; coding: utf-8 -*-
+import sys
+
+from PyQt5 import uic
+
+sys.path.insert(0, SPECPATH)
+from frozen_modules import EXCLUDES, GUI_QT_EXCLUDES, GUI_VTK_MODULES, VTK_MODULES
 
 
 block_cipher = None
 
 
+# UI compiled into the TPMSgen_GUI_ui module, which the frozen GUI imports instead of parsing the UI:
+os.makedirs(workpath, exist_ok=True)
+with open(os.path.join(SPECPATH, '..', 'src', 'TPMSgen_GUI.ui'), 'r') as ui_file:
+    with open(os.path.join(workpath, 'TPMSgen_GUI_ui.py'), 'w') as module_file:
+        uic.compileUi(ui_file, module_file)
+
+# Only the VTK modules of the preview and the PyVista figures, and the Qt modules of the GUI (see
+# frozen_modules.py):
 a = Analysis(
     ['../TPMSgen_GUI.py'],
-    pathex=[],
+    pathex=[workpath],
     binaries=[],
     datas=[],
-    hiddenimports=[
-    	    'vtkmodules',
-	    'vtkmodules.all',
-	    'vtkmodules.qt.QVTKRenderWindowInteractor',
-	    'vtkmodules.util',
-	    'vtkmodules.util.numpy_support',
-	    'vtkmodules.numpy_interface.dataset_adapter',
-	   ],
+    hiddenimports=VTK_MODULES + GUI_VTK_MODULES,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUDES + GUI_QT_EXCLUDES,
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -28,6 +35,7 @@ a = Analysis(
 )
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
+# One-folder build without UPX, so that nothing is extracted or decompressed at every launch:
 exe = EXE(
     pyz,
     a.scripts,
@@ -37,7 +45,7 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -51,7 +59,7 @@ coll = COLLECT(
     a.zipfiles,
     a.datas,
     strip=False,
-    upx=True,
+    upx=False,
     upx_exclude=[],
     name='TPMSgen_GUI',
 )
@@ -0,0 +1,98 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+# Modules of the frozen builds, shared by the spec files.
+
+# VTK modules loaded by the PyVista figures and the GUI preview, bundled instead of vtkmodules.all (every
+# VTK module). PyVista imports them on demand, so they are not found by PyInstaller. Run this file to list
+# them again after upgrading PyVista or VTK.
+VTK_MODULES = [
+    'vtkmodules.numpy_interface.array_overrides',
+    'vtkmodules.numpy_interface.dataset_adapter',
+    'vtkmodules.numpy_interface.vtk_affine_array',
+    'vtkmodules.numpy_interface.vtk_aos_array',
+    'vtkmodules.numpy_interface.vtk_composite_array',
+    'vtkmodules.numpy_interface.vtk_constant_array',
+    'vtkmodules.numpy_interface.vtk_implicit_array',
+    'vtkmodules.numpy_interface.vtk_indexed_array',
+    'vtkmodules.numpy_interface.vtk_soa_array',
+    'vtkmodules.numpy_interface.vtk_strided_array',
+    'vtkmodules.numpy_interface.vtk_structured_point_array',
+    'vtkmodules.util.data_array_selection',
+    'vtkmodules.util.data_model',
+    'vtkmodules.util.execution_model',
+    'vtkmodules.util.numpy_support',
+    'vtkmodules.util.pickle_support',
+    'vtkmodules.util.vtkAlgorithm',
+    'vtkmodules.vtkChartsCore',
+    'vtkmodules.vtkCommonColor',
+    'vtkmodules.vtkCommonCore',
+    'vtkmodules.vtkCommonDataModel',
+    'vtkmodules.vtkCommonExecutionModel',
+    'vtkmodules.vtkCommonMath',
+    'vtkmodules.vtkCommonMisc',
+    'vtkmodules.vtkCommonSystem',
+    'vtkmodules.vtkCommonTransforms',
+    'vtkmodules.vtkFiltersCore',
+    'vtkmodules.vtkFiltersGeneral',
+    'vtkmodules.vtkFiltersPython',
+    'vtkmodules.vtkFiltersSources',
+    'vtkmodules.vtkIOCore',
+    'vtkmodules.vtkIOImage',
+    'vtkmodules.vtkImagingCore',
+    'vtkmodules.vtkImagingMath',
+    'vtkmodules.vtkImagingSources',
+    'vtkmodules.vtkInteractionStyle',
+    'vtkmodules.vtkInteractionWidgets',
+    'vtkmodules.vtkParallelCore',
+    'vtkmodules.vtkPythonContext2D',
+    'vtkmodules.vtkRenderingAnnotation',
+    'vtkmodules.vtkRenderingContext2D',
+    'vtkmodules.vtkRenderingContextOpenGL2',
+    'vtkmodules.vtkRenderingCore',
+    'vtkmodules.vtkRenderingFreeType',
+    'vtkmodules.vtkRenderingHyperTreeGrid',
+    'vtkmodules.vtkRenderingLabel',
+    'vtkmodules.vtkRenderingMatplotlib',
+    'vtkmodules.vtkRenderingOpenGL2',
+    'vtkmodules.vtkRenderingUI',
+    'vtkmodules.vtkRenderingVolume',
+    'vtkmodules.vtkRenderingVolumeOpenGL2',
+    'vtkmodules.vtkViewsContext2D',
+    'vtkmodules.vtkViewsCore']
+
+# Qt interactor of the GUI preview:
+GUI_VTK_MODULES = ['vtkmodules.qt.QVTKRenderWindowInteractor']
+
+# Qt modules that the GUI does not use (only QtCore, QtGui and QtWidgets are used):
+GUI_QT_EXCLUDES = ['PyQt5.' + name for name in ['Qt', 'QtBluetooth', 'QtDBus', 'QtDesigner', 'QtHelp', 'QtLocation', 'QtMultimedia', 'QtMultimediaWidgets', 'QtNetwork', 'QtNfc', 'QtOpenGL', 'QtPositioning', 'QtPrintSupport', 'QtQml', 'QtQuick', 'QtQuick3D', 'QtQuickWidgets', 'QtRemoteObjects', 'QtSensors', 'QtSerialPort', 'QtSql', 'QtSvg', 'QtTest', 'QtTextToSpeech', 'QtWebChannel', 'QtWebSockets', 'QtX11Extras', 'QtXml', 'QtXmlPatterns', 'uic']]
+
+# Modules that TPMSgen never uses. PyVista only imports vtk (which imports vtkmodules.all) for type
+# checkers. Numba cannot cache its compiled kernels inside a bundle, so they would be compiled again at
+# every launch: the NumExpr or NumPy field backends are used instead (see core.field_kernel).
+EXCLUDES = ['vtk', 'vtkmodules.all', 'numba', 'llvmlite', 'IPython', 'jedi', 'tkinter', 'PySide2', 'PySide6']
+
+# Modules also left out of the headless CLI build, which does not render any figure:
+HEADLESS_EXCLUDES = EXCLUDES + ['pyvista', 'vtkmodules', 'PyQt5', 'matplotlib', 'PIL']
+
+# List the VTK modules loaded while rendering every figure off-screen:
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src import core
+    import pyvista as pv
+    import vtkmodules.vtkInteractionStyle
+    import vtkmodules.vtkRenderingOpenGL2
+
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        mesh, _ = core.fn_plot_tpms_eq('Shell', 'Shell-TPMS Gyroid', [10, 10, 10], [10, 10, 10], [0, 0, 0], 20, 0, 1, None, render = os.path.join(directory, 'tpms_equation.png'))
+        core.fn_check_face_normals(mesh, render = os.path.join(directory, 'face_normals.png'))
+        mesh = core.fn_generate_mesh('Shell', 'Shell-TPMS Gyroid', 0, 1, [10, 10, 10], [10, 10, 10], [0, 0, 0], 20, None, False, silent = True, render = os.path.join(directory, 'mesh.png'))
+        pv.wrap(mesh)
+
+    packages = {name.rsplit('.', 1)[0] for name in sys.modules if name.startswith('vtkmodules.')}
+    for name in sorted(sys.modules):
+        if name.startswith('vtkmodules.') and name not in packages and not name.split('.')[-1].startswith('_'):
+            print(name)
@@ -0,0 +1,261 @@
+import itertools
+import json
+import os
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from src import cache as mesh_cache
+from src import core
+
+# Job file parameters that can be swept (a single value or a list of values):
+SWEEP_PARAMETERS = ['tpms_design', 'c', 'thickness', 'sizes', 'cell_sizes', 'origin', 'unit_cell_mesh_resolution', 'flip_face_normals']
+VECTOR_PARAMETERS = ['sizes', 'cell_sizes', 'origin']
+
+# Default values (the same as the interactive CLI):
+DEFAULT_PARAMETERS = {
+    'c': 0.5,
+    'thickness': 3,
+    'sizes': [40, 40, 40],
+    'cell_sizes': [40, 40, 40],
+    'origin': [0, 0, 0],
+    'unit_cell_mesh_resolution': 50,
+    'flip_face_normals': False}
+
+# MAIN FUNCTIONS
+# Run batch:
+# Generates and exports the STL file of every job of a JSON/YAML job file, without any rendering. Options
+# given in the job file override the ones passed as arguments. With several parallel jobs, jobs run in a
+# process pool as long as the sum of their estimated peak memory fits in memory_budget (in MB). A job that
+# does not fit on its own runs alone. The jobs running in a worker pool that breaks (e.g. a worker killed
+# when out of memory) are recorded as failed and the remaining jobs run in a new pool. A results manifest
+# is written into the output directory (with the profiling report of every job when profile is enabled).
+def fn_run_batch(job_file, workers = 1, replicate_cells = False, cache = None, silent = False, parallel_jobs = 1, memory_budget = None, precision = 'float64', profile = False, sparse = False):
+    job = load_job_file(job_file)
+    jobs = expand_job(job)
+
+    # Output options:
+    output_directory = job.get('output_directory', os.path.join(os.path.dirname(os.path.abspath(job_file)), 'output'))
+    file_format = job.get('file_format', 'auto')
+    os.makedirs(output_directory, exist_ok = True)
+
+    # Mesh generation options:
+    options = job.get('options', {})
+    workers = options.get('workers', workers)
+    replicate_cells = options.get('replicate_cells', replicate_cells)
+    tile_budget = options.get('tile_budget', None)
+    engine = options.get('engine', 'native')
+    parallel_jobs = options.get('parallel_jobs', parallel_jobs)
+    memory_budget = options.get('memory_budget', memory_budget)
+    precision = options.get('precision', precision)
+    profile = options.get('profile', profile)
+    sparse = options.get('sparse', sparse)
+    if 'cache_dir' in options:
+        cache = mesh_cache.mesh_cache(options['cache_dir'], options.get('cache_size', 1024))
+
+    # Reduced precision jobs may fall back to float64 (see core.generate_mesh), so they are estimated in float64:
+    for parameters in jobs:
+        parameters['estimated_memory'] = estimate_job_memory(parameters, tile_budget, 'float64', workers)
+
+    job_options = (output_directory, file_format, engine, tile_budget, workers, replicate_cells, cache, precision, profile, sparse)
+
+    start = time.perf_counter()
+    results = []
+    def report(parameters, result):
+        results.append(result)
+        if not silent:
+            if 'error' in result:
+                status = 'FAILED (' + result['error'] + ')'
+            else:
+                status = str(result['faces']) + ' faces, ' + ('watertight' if result['is_watertight'] else 'NOT watertight') + ', ' + format(result['time'], '.2f') + ' s'
+            print('[' + str(len(results)) + '/' + str(len(jobs)) + '] ' + parameters['file_name'] + ': ' + status)
+
+    if parallel_jobs == 1 or len(jobs) == 1:
+        for parameters in jobs:
+            report(parameters, run_job_safely(parameters, *job_options))
+    else:
+        # Largest jobs first, so that small jobs fill the remaining memory:
+        pending = sorted(jobs, key = lambda parameters: parameters['estimated_memory'], reverse = True)
+        running = {}
+        while pending:
+            # A pool broken by a killed worker (e.g. out of memory) fails its running jobs and is replaced:
+            with ProcessPoolExecutor(max_workers = parallel_jobs) as executor:
+                broken = False
+                while (pending and not broken) or running:
+                    used_memory = sum(parameters['estimated_memory'] for parameters in running.values())
+                    for parameters in list(pending):
+                        if len(running) == parallel_jobs or broken:
+                            break
+                        fits = memory_budget is None or used_memory + parameters['estimated_memory'] <= memory_budget
+                        if fits or not running:
+                            try:
+                                running[executor.submit(run_job_safely, parameters, *job_options)] = parameters
+                            except BrokenProcessPool:
+                                broken = True
+                                break
+                            pending.remove(parameters)
+                            used_memory += parameters['estimated_memory']
+
+                    if not running:
+                        continue
+                    done, _ = wait(running, return_when = FIRST_COMPLETED)
+                    for future in done:
+                        parameters = running.pop(future)
+                        try:
+                            result = future.result()
+                        except BrokenProcessPool as error:
+                            broken = True
+                            result = {'file_name': parameters['file_name'], 'error': 'BrokenProcessPool: ' + str(error)}
+                        report(parameters, result)
+
+    write_manifest(os.path.join(output_directory, 'manifest.json'), job_file, jobs, results, time.perf_counter() - start)
+
+    return results
+
+# SUPLEMENTARY FUNCTIONS:
+# Load job file
+def load_job_file(job_file):
+    with open(job_file, 'r') as file:
+        if os.path.splitext(job_file)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError('PyYAML is required to read YAML job files (pip install pyyaml), or use a JSON job file instead.')
+            job = yaml.safe_load(file)
+        else:
+            job = json.load(file)
+
+    if not isinstance(job, dict):
+        raise ValueError('Job file must contain a mapping of parameters: ' + str(job_file))
+
+    return job
+
+# Parameter values
+# A single value or a list of values (a list of vectors for sizes, cell_sizes and origin):
+def parameter_values(name, value):
+    if name in VECTOR_PARAMETERS:
+        if len(value) > 0 and not isinstance(value[0], (list, tuple)):
+            value = [value]
+        for vector in value:
+            if len(vector) != 3:
+                raise ValueError('Invalid ' + name + ' value (3 values expected): ' + str(vector))
+        return [[float(x) for x in vector] for vector in value]
+
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+
+    return list(value)
+
+# Expand job
+# Cartesian product of the swept parameters. c only applies to Skeletal designs and thickness to Shell
+# designs, so the other value is fixed (as in the interactive CLI) and duplicated jobs are dropped.
+def expand_job(job):
+    if 'tpms_design' not in job:
+        raise ValueError('Job file must define tpms_design.')
+
+    unknown_parameters = set(job) - set(SWEEP_PARAMETERS) - {'output_directory', 'file_format', 'options'}
+    if unknown_parameters:
+        raise ValueError('Unknown job file parameters: ' + ', '.join(sorted(unknown_parameters)))
+
+    values = [parameter_values(name, job.get(name, DEFAULT_PARAMETERS.get(name))) for name in SWEEP_PARAMETERS]
+
+    jobs = []
+    file_names = set()
+    for combination in itertools.product(*values):
+        parameters = dict(zip(SWEEP_PARAMETERS, combination))
+
+        tpms_design = parameters['tpms_design']
+        if tpms_design not in core.TPMS_DESIGNS:
+            raise ValueError('Design not found in library: ' + str(tpms_design))
+        if parameters['unit_cell_mesh_resolution'] < 20:
+            raise ValueError('Unit cell mesh resolution must be at least 20.')
+
+        if tpms_design.startswith('Shell'):
+            parameters['tpms_type'] = 'Shell'
+            parameters['c'] = 0
+            parameters['thickness'] = float(parameters['thickness'])
+        else:
+            parameters['tpms_type'] = 'Skeletal'
+            parameters['c'] = float(parameters['c'])
+            parameters['thickness'] = 0
+
+        parameters['file_name'] = job_file_name(parameters)
+        if parameters['file_name'] not in file_names:
+            file_names.add(parameters['file_name'])
+            jobs.append(parameters)
+
+    return jobs
+
+# Job file name
+def job_file_name(parameters):
+    design = parameters['tpms_design'].replace('-TPMS', '').replace('(', '').replace(')', '').replace(' ', '_')
+    if parameters['tpms_type'] == 'Shell':
+        value = 't' + format(parameters['thickness'], 'g')
+    else:
+        value = 'c' + format(parameters['c'], 'g')
+
+    vectors = ['x'.join(format(x, 'g') for x in parameters[name]) for name in VECTOR_PARAMETERS]
+    file_name = '_'.join([design, value, 's' + vectors[0], 'cs' + vectors[1], 'o' + vectors[2], 'r' + str(parameters['unit_cell_mesh_resolution'])])
+    if parameters['flip_face_normals']:
+        file_name += '_flipped'
+
+    return file_name
+
+# Estimate job memory
+# Rough peak memory (in MB) of a job: core.bytes_per_node bytes per node of the padded grid (or the tile
+# budget of each of the workers, which mesh their bricks at the same time), 200 bytes per triangle, with
+# up to 20 triangles per unit cell cube, and PROCESS_MEMORY per process (the job and its workers).
+PROCESS_MEMORY = 100
+
+def estimate_job_memory(parameters, tile_budget = None, precision = 'float64', workers = 1):
+    _, spacing = core.generate_axes(1, parameters['sizes'], parameters['cell_sizes'], parameters['unit_cell_mesh_resolution'])
+    n_nodes = len(spacing[0]) * len(spacing[1]) * len(spacing[2])
+
+    grid_memory = core.bytes_per_node(precision) * n_nodes / 1024**2
+    if tile_budget is not None:
+        grid_memory = min(grid_memory, workers * tile_budget)
+    n_cubes = (len(spacing[0]) - 3) * (len(spacing[1]) - 3) * (len(spacing[2]) - 3)
+    mesh_memory = 200 * 20 * n_cubes / parameters['unit_cell_mesh_resolution'] / 1024**2
+    n_processes = 1 + workers if workers > 1 else 1
+
+    return grid_memory + mesh_memory + n_processes * PROCESS_MEMORY
+
+# Run job
+def run_job(parameters, output_directory, file_format = 'auto', engine = 'native', tile_budget = None, workers = 1, replicate_cells = False, cache = None, precision = 'float64', profile = False, sparse = False):
+    start = time.perf_counter()
+    profiler = core.generation_profiler() if profile else None
+    mesh, is_watertight = core.generate_mesh(parameters['tpms_type'], parameters['tpms_design'], parameters['c'], parameters['thickness'], parameters['sizes'], parameters['cell_sizes'], parameters['origin'], parameters['unit_cell_mesh_resolution'], parameters['flip_face_normals'], silent = True, engine = engine, tile_budget = tile_budget, workers = workers, replicate_cells = replicate_cells, cache = cache, precision = precision, profiler = profiler, sparse = sparse)
+    core.fn_export_stl_file(mesh, parameters['file_name'], output_directory, silent = True, file_format = file_format, profiler = profiler)
+
+    result = {
+        'file_name': parameters['file_name'],
+        'file_path': os.path.join(output_directory, parameters['file_name'] + '.stl'),
+        'faces': len(mesh.faces),
+        'is_watertight': bool(is_watertight),
+        'time': time.perf_counter() - start}
+    if profiler is not None:
+        result['profile'] = profiler.report()
+
+    return result
+
+# Run job safely
+# A failed job is reported in the manifest instead of stopping the whole batch:
+def run_job_safely(parameters, *job_options):
+    try:
+        return run_job(parameters, *job_options)
+    except Exception as error:
+        return {'file_name': parameters['file_name'], 'error': type(error).__name__ + ': ' + str(error)}
+
+# Write manifest
+def write_manifest(file_path, job_file, jobs, results, total_time):
+    results = {result['file_name']: result for result in results}
+
+    manifest = {'job_file': os.path.abspath(job_file), 'total_time': total_time, 'jobs': []}
+    for parameters in jobs:
+        entry = {name: parameters[name] for name in ['tpms_type'] + SWEEP_PARAMETERS}
+        entry['estimated_memory'] = parameters['estimated_memory']
+        entry.update(results[parameters['file_name']])
+        manifest['jobs'].append(entry)
+
+    with open(file_path, 'w') as file:
+        json.dump(manifest, file, indent = 4)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import zipfile
+
+import numpy as np
+
+from src import __version__
+
+# Cache format
+# Cached meshes are invalidated by a new release or a new cache format. CACHE_FORMAT must be bumped
+# whenever a change of the meshing code changes the generated meshes (the source is not read at runtime,
+# as frozen builds do not include it):
+CACHE_FORMAT = 2
+
+def code_version():
+    return __version__ + '-' + str(CACHE_FORMAT)
+
+# Mesh cache
+# Content-addressed on-disk cache of generated meshes. Every mesh is stored as a .npz file (vertices and
+# faces) named after the hash of its design parameters. The modification time of the files is used as
+# the last access time, and the least recently used meshes are evicted beyond max_size (in MB).
+class mesh_cache:
+    def __init__(self, directory = None, max_size = 1024, compressed = True):
+        if directory is None:
+            directory = os.environ.get('TPMSGEN_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'tpmsgen'))
+
+        self.directory = directory
+        self.max_size = max_size
+        self.compressed = compressed
+        self.version = code_version()
+
+        os.makedirs(self.directory, exist_ok = True)
+
+    # Cache key:
+    # Numbers are normalized, so that e.g. thickness = 3 (CLI) and 3.0 (job file) give the same key.
+    def key(self, tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, flip_face_normals, engine = 'native', precision = 'float64'):
+        vectors = [[float(value) for value in vector] for vector in (sizes, cell_sizes, origin)]
+        parameters = [tpms_type, tpms_design, float(c), float(thickness), *vectors, int(unit_cell_mesh_resolution), bool(flip_face_normals), engine, str(precision), self.version]
+        parameters = json.dumps(parameters, default = float)
+
+        return hashlib.sha256(parameters.encode()).hexdigest()
+
+    def file_path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    # Load a cached mesh (None if it is not cached):
+    def load(self, key):
+        import trimesh
+
+        file_path = self.file_path(key)
+        try:
+            with np.load(file_path) as data:
+                vertices = data['vertices']
+                faces = data['faces']
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            # Missing, truncated or corrupt files are cache misses:
+            return None
+
+        # The file may have been evicted meanwhile by another process sharing the cache:
+        try:
+            os.utime(file_path)
+        except FileNotFoundError:
+            pass
+
+        return trimesh.Trimesh(vertices = vertices, faces = faces, process = False)
+
+    # Store a mesh and evict the least recently used ones:
+    # A mesh that cannot be stored is only left out of the cache, so that it never fails a generation.
+    def store(self, key, mesh):
+        file_path = self.file_path(key)
+
+        # Written to a temporary file first, so that concurrent readers never see a partial file:
+        temporary_path = file_path + '.' + str(os.getpid()) + '.tmp'
+        try:
+            with open(temporary_path, 'wb') as file:
+                if self.compressed:
+                    np.savez_compressed(file, vertices = mesh.vertices, faces = mesh.faces)
+                else:
+                    np.savez(file, vertices = mesh.vertices, faces = mesh.faces)
+            os.replace(temporary_path, file_path)
+        except OSError:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            return
+
+        self.evict()
+
+    # Remove the least recently used meshes until the cache fits in max_size:
+    # Files removed meanwhile by another process sharing the cache are skipped.
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(entry[1] for entry in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size * 1024**2:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    # Remove every cached mesh:
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                os.remove(entry.path)
@@ -1,195 +1,603 @@
-import copy
+import contextlib
+import functools
+import json
 import os
-import trimesh
+import sys
+import threading
+import time
 
 import numpy as np
-import pyvista as pv
 
-from skimage import measure
+from concurrent.futures import ProcessPoolExecutor
+
+# trimesh, scikit-image and PyVista (which loads VTK) are imported by the functions that use them, so that
+# importing this module stays fast (e.g. CLI --help or short batch processes), and VTK is only loaded when
+# a figure is rendered.
 
 # MAIN FUNCTIONS
+# Every function takes a render argument: True shows the result in an interactive window, a file path
+# renders it off-screen into that PNG file and False skips rendering (no VTK plotter is created).
+# precision is the floating point type of the field ('float64' or 'float32', which halves the memory
+# of the grid, see PRECISION_TOLERANCE). A generation_profiler records the time and memory of every stage.
 # Plot TPMS equation:
-def fn_plot_tpms_eq(tpms_type, tpms_design, sizes, cell_sizes, origin, unit_cell_mesh_resolution, c, thickness, mesh):
-    # Generation of the meshgrid:
-    tols = [0, 0, 0]
-    X, Y, Z, tols, spacing  = generate_meshgrid(0, sizes, cell_sizes, unit_cell_mesh_resolution)
+def fn_plot_tpms_eq(tpms_type, tpms_design, sizes, cell_sizes, origin, unit_cell_mesh_resolution, c, thickness, mesh, render = True, generator = None, precision = 'float64'):
+    # Generate and mesh TPMS:
+    generator = configure_generator(generator, tpms_type = tpms_type, tpms_design = tpms_design, c = c, thickness = thickness, sizes = sizes, cell_sizes = cell_sizes, origin = origin, unit_cell_mesh_resolution = unit_cell_mesh_resolution, precision = precision)
+    mesh, vertices = generator.surface()
 
-    # Generate TPMS:
-    F, t = tpms_library(X, Y, Z, c, tpms_design, cell_sizes, origin)
+    if render:
+        # Colour TPMS vertices:
+        color = np.prod(vertices, axis = 1)
 
-    # Mesh TPMS:
-    if tpms_type == 'Shell':
-        mesh, vertices = mesh_shell(F, t, thickness, sizes, mesh, tols, spacing)
-    else:
-        mesh, vertices = mesh_skeletal(F, sizes, mesh, tols, spacing)
-
-    # Colour TPMS vertices:
-    color = []
-    for vert in vertices:
-        color.append(vert[0] * vert[1] * vert[2])
-    color = np.array(color)
-
-    # Plot TPMS vertices:
-    plotter1 = pv.Plotter(window_size = [1400, 1600])
-    _ = plotter1.add_title('Close this window to continue', font_size = 10)
-    _ = plotter1.add_mesh(vertices, scalars = color, cmap = 'jet')
-    _ = plotter1.remove_scalar_bar()
-    _ = plotter1.show_grid()
-    plotter1.show()
+        # Plot TPMS vertices:
+        plotter1 = create_plotter(render)
+        _ = plotter1.add_title('Close this window to continue', font_size = 10)
+        _ = plotter1.add_mesh(vertices, scalars = color, cmap = 'jet')
+        _ = plotter1.remove_scalar_bar()
+        _ = plotter1.show_grid()
+        show_plotter(plotter1, render)
 
     return mesh, vertices
 
 # Check face normals:
-def fn_check_face_normals(mesh, silent = False):
-    # Calculate face centroids and normals:
-    mesh_pv = pv.wrap(mesh)
-    cent = mesh_pv.cell_centers().points
-    direction = mesh_pv.cell_normals
-
+def fn_check_face_normals(mesh, silent = False, render = True):
     # Update output message:
     if not silent:
         print('\nCheck if face normals are pointing OUT of the mesh')
 
     # Plot TPMS face normals:
-    plotter2 = pv.Plotter(window_size = [1400, 1600])
-    _ = plotter2.add_title('Close this window to continue', font_size = 10)
-    _ = plotter2.add_mesh(mesh, color = True, show_edges = True)
-    _ = plotter2.add_arrows(cent, direction, mag = 1)
-    _ = plotter2.remove_scalar_bar()
-    _ = plotter2.show_grid()
-    plotter2.show()
+    if render:
+        plot_face_normals(mesh, render)
 
     return mesh
 
 # Check face normals:
-def fn_flip_face_normals(mesh, silent = False):
+def fn_flip_face_normals(mesh, silent = False, render = True):
     # Flip mesh:
-    mesh = pv.wrap(mesh)
-    mesh.flip_normals()
-    mesh = mesh_conversion(mesh)
+    mesh = flip_faces(mesh)
 
     if not silent:
         print('Face normals were flipped. Now face normals should be pointing OUT of the mesh')
 
-    # Calculate face centroids and normals:
-    mesh_pv = pv.wrap(mesh)
-    cent = mesh_pv.cell_centers().points
-    direction = mesh_pv.cell_normals
-    
     # Plot TPMS face normals:
-    plotter3 = pv.Plotter(window_size = [1400, 1600])
-    _ = plotter3.add_title('Close this window to continue', font_size = 10)
-    _ = plotter3.add_mesh(mesh, color = True, show_edges = True)
-    _ = plotter3.add_arrows(cent, direction, mag = 1)
-    _ = plotter3.remove_scalar_bar()
-    _ = plotter3.show_grid()
-    plotter3.show()
+    if render:
+        plot_face_normals(mesh, render)
 
     return mesh
 
 # Generate mesh:
-def fn_generate_mesh(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, mesh, flip_face_normals, silent = False):
+def fn_generate_mesh(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, mesh, flip_face_normals, silent = False, engine = 'native', tile_budget = None, workers = 1, replicate_cells = False, cache = None, render = True, generator = None, precision = 'float64', profiler = None, sparse = False):
+    generator = configure_generator(generator, tpms_type = tpms_type, tpms_design = tpms_design, c = c, thickness = thickness, sizes = sizes, cell_sizes = cell_sizes, origin = origin, unit_cell_mesh_resolution = unit_cell_mesh_resolution, flip_face_normals = flip_face_normals, engine = engine, tile_budget = tile_budget, workers = workers, replicate_cells = replicate_cells, cache = cache, precision = precision, sparse = sparse)
+    iterative_mesh, is_watertight = generator.generate(silent, profiler = profiler)
+
+    # Update output message:
+    if not silent:
+        if is_watertight:
+            print('Mesh is generated!')
+            print('The obtained mesh is watertight. If the opposite solution was desired, try using the opposite face normals direction.')
+        else:
+            print('Mesh is generated:')
+            print('Cannot obtain a watertight mesh. Try increasing unit cell mesh resolution. Please, check results carefully and treat them to solve this issue.')
+    
+    # Plot generated mesh:
+    if render:
+        plot_mesh(iterative_mesh, render)
+
+    return iterative_mesh
+
+# Export mesh:
+# file_format is 'ascii', 'binary' or 'auto' (binary for meshes above ascii_face_limit faces).
+def fn_export_stl_file(iterative_mesh, file_name, directory_path, silent = False, file_format = 'auto', ascii_face_limit = 100000, profiler = None):
+    file_path = os.path.join(directory_path, file_name + '.stl')
+
+    if file_format == 'auto':
+        file_format = 'binary' if len(iterative_mesh.faces) > ascii_face_limit else 'ascii'
+
+    with profile_stage(profiler, 'export'):
+        if file_format == 'binary':
+            write_binary_stl(file_path, iterative_mesh.vertices, iterative_mesh.faces)
+        elif file_format == 'ascii':
+            import trimesh
+            export = trimesh.exchange.stl.export_stl_ascii(iterative_mesh)
+            with open(file_path, 'w') as file:
+                file.write(export)
+        else:
+            raise ValueError('Unknown STL file format: ' + str(file_format))
+
+    if profiler is not None:
+        profiler.count('export', triangles = len(iterative_mesh.faces), file_mb = os.path.getsize(file_path) / 1024**2)
+    
+    if not silent:
+        print('\nMesh exported as .STL into ' + file_path)
+
+# TPMS GENERATOR
+# Engine shared by the fn_* functions, the GUI and the CLI. It is configured with the design and grid
+# parameters (which can be updated between calls) and keeps its field buffers allocated, so that repeated
+# evaluations on grids of the same shape do not allocate them again. The field, the surface, the preview
+# and the clipped mesh are kept between calls and only recomputed when one of the parameters they depend
+# on (STATE_PARAMETERS) changes: e.g. a new thickness re-meshes the surface from the stored field, and the
+# clipped mesh is generated from the field already evaluated for the surface. Returned meshes are shared
+# with the generator, so they must not be modified in place.
+GENERATOR_PARAMETERS = {
+    'tpms_type': None,
+    'tpms_design': None,
+    'c': 0,
+    'thickness': None,
+    'sizes': None,
+    'cell_sizes': None,
+    'origin': [0, 0, 0],
+    'unit_cell_mesh_resolution': 50,
+    'flip_face_normals': False,
+    'engine': 'native',
+    'tile_budget': None,
+    'workers': 1,
+    'replicate_cells': False,
+    'cache': None,
+    'precision': 'float64',
+    'sparse': False}
+
+FIELD_PARAMETERS = ['tpms_design', 'c', 'sizes', 'cell_sizes', 'origin', 'unit_cell_mesh_resolution', 'precision']
+STATE_PARAMETERS = {
+    'field': FIELD_PARAMETERS,
+    'surface': FIELD_PARAMETERS + ['tpms_type', 'thickness'],
+    'preview': ['tpms_type', 'tpms_design', 'c', 'thickness', 'sizes', 'cell_sizes', 'origin', 'flip_face_normals', 'precision'],
+    'mesh': FIELD_PARAMETERS + ['tpms_type', 'thickness', 'flip_face_normals', 'engine', 'replicate_cells']}
+
+class tpms_generator:
+    def __init__(self, **parameters):
+        self.field_buffer = None
+        self.scratch_buffer = None
+        self.state = {}
+        for name, value in GENERATOR_PARAMETERS.items():
+            setattr(self, name, value)
+
+        self.update(**parameters)
+
+    # Update parameters:
+    # Stored results that depend on a changed parameter are released.
+    def update(self, **parameters):
+        for name, value in parameters.items():
+            if name not in GENERATOR_PARAMETERS:
+                raise TypeError('Unknown TPMS generator parameter: ' + name)
+            setattr(self, name, value)
+
+        for name in list(self.state):
+            if self.state[name][0] != self.state_key(name):
+                del self.state[name]
+
+    # State key
+    # Values of the parameters a stored result depends on:
+    def state_key(self, name):
+        return tuple(repr(getattr(self, parameter)) for parameter in STATE_PARAMETERS[name])
+
+    # Stored result (computed by function if missing or outdated):
+    def stored(self, name, function):
+        key = self.state_key(name)
+        if name not in self.state or self.state[name][0] != key:
+            self.state[name] = (key, function())
+
+        return self.state[name][1]
+
+    # TPMS field on the bounding box grid:
+    def field(self):
+        return self.stored('field', self.evaluate_field)
+
+    def evaluate_field(self):
+        tols, spacing = generate_axes(0, self.sizes, self.cell_sizes, self.unit_cell_mesh_resolution)
+
+        shape = (len(spacing[0]), len(spacing[1]), len(spacing[2]))
+        if self.field_buffer is None or self.field_buffer.shape != shape or self.field_buffer.dtype != self.precision:
+            self.field_buffer = np.empty(shape, dtype = self.precision)
+            self.scratch_buffer = np.empty(shape, dtype = self.precision) if field_kernel(FIELD_BACKEND) is None else None
+
+        F, t = tpms_field(spacing, self.c, self.tpms_design, self.cell_sizes, self.origin, out = self.field_buffer, scratch = self.scratch_buffer)
+
+        return F, t, tols, spacing
+
+    # Surface of the TPMS (not clipped), as plotted by fn_plot_tpms_eq:
+    def surface(self):
+        return self.stored('surface', self.mesh_surface)
+
+    def mesh_surface(self):
+        F, t, tols, spacing = self.field()
+
+        if self.tpms_type == 'Shell':
+            return mesh_shell(F, t, self.thickness, self.sizes, None, tols, spacing)
+
+        return mesh_skeletal(F, self.sizes, None, tols, spacing)
+
+    # Low resolution preview of the clipped TPMS:
+    def preview(self):
+        return self.stored('preview', lambda: preview_mesh(self.tpms_type, self.tpms_design, self.c, self.thickness, self.sizes, self.cell_sizes, self.origin, self.flip_face_normals, precision = self.precision))
+
+    # Clipped TPMS mesh (and whether it is watertight):
+    # The field is not evaluated for the mesh alone (bricks evaluate their own part of it), but a field
+    # already stored for the surface is reused.
+    def generate(self, silent = True, progress = None, profiler = None):
+        if profiler is not None:
+            profiler.info['stored_mesh'] = 'mesh' in self.state and self.state['mesh'][0] == self.state_key('mesh')
+
+        return self.stored('mesh', lambda: self.generate_mesh(silent, progress, profiler))
+
+    def generate_mesh(self, silent, progress, profiler):
+        field = None
+        if 'field' in self.state and self.state['field'][0] == self.state_key('field'):
+            F, t, _, _ = self.state['field'][1]
+            field = (F, t)
+
+        return generate_mesh(self.tpms_type, self.tpms_design, self.c, self.thickness, self.sizes, self.cell_sizes, self.origin, self.unit_cell_mesh_resolution, self.flip_face_normals, silent, self.engine, self.tile_budget, self.workers, self.replicate_cells, self.cache, progress, field, self.precision, profiler, self.sparse)
+
+# Configure generator
+# Updates the given generator, or creates a new one:
+def configure_generator(generator, **parameters):
+    if generator is None:
+        return tpms_generator(**parameters)
+
+    generator.update(**parameters)
+
+    return generator
+
+# SUPLEMENTARY FUNCTIONS:
+# Create plotter
+# Off-screen when rendering into a PNG file:
+def create_plotter(render):
+    import pyvista as pv
+
+    return pv.Plotter(window_size = [1400, 1600], off_screen = render is not True)
+
+# Show plotter
+def show_plotter(plotter, render):
+    if render is True:
+        plotter.show()
+    else:
+        plotter.show(screenshot = render)
+        plotter.close()
+
+# Plot mesh
+def plot_mesh(mesh, render):
+    plotter = create_plotter(render)
+    _ = plotter.add_title('Generated mesh can be exported into STL format', font_size = 10)
+    _ = plotter.add_mesh(mesh, color = True, show_edges = True)
+    _ = plotter.show_grid()
+    show_plotter(plotter, render)
+
+# Plot face normals
+# Face centroids and normals are taken from trimesh, so no PyVista conversion of the mesh is needed:
+def plot_face_normals(mesh, render):
+    plotter = create_plotter(render)
+    _ = plotter.add_title('Close this window to continue', font_size = 10)
+    _ = plotter.add_mesh(mesh, color = True, show_edges = True)
+    _ = plotter.add_arrows(mesh.triangles_center, mesh.face_normals, mag = 1)
+    _ = plotter.remove_scalar_bar()
+    _ = plotter.show_grid()
+    show_plotter(plotter, render)
+
+# Generate mesh
+# Render-free mesh generation used by fn_generate_mesh, the batch mode and the GUI worker. Returns the mesh
+# and whether it is watertight. progress is called with a stage message and the completed fraction between
+# stages, and may raise generation_cancelled to abort the generation.
+def generate_mesh(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, flip_face_normals, silent = False, engine = 'native', tile_budget = None, workers = 1, replicate_cells = False, cache = None, progress = None, field = None, precision = 'float64', profiler = None, sparse = False):
     is_watertight = False
     k = int(5 / 100 * unit_cell_mesh_resolution)
     k_max = int(45 / 100 * unit_cell_mesh_resolution)
     k_increment = int(5 / 100 * unit_cell_mesh_resolution)
-    iterative_mesh = copy.deepcopy(mesh)
+    iterative_mesh = None
 
-    # Mesh generation iterative process:
-    if tpms_type == 'Shell':
-        # Generate bounding box:
-        shell_bounding_box = trimesh.creation.box(extents = (sizes[0], sizes[1], sizes[2]), transform = None)
-        while not is_watertight and k <= k_max:
-            # Generation of the meshgrid:
-            X, Y, Z, tols, spacing  = generate_meshgrid(k, sizes, cell_sizes, unit_cell_mesh_resolution)
-            
-            # Generate TPMS for intersection:
-            F, t = tpms_library(X, Y, Z, c, tpms_design, cell_sizes, origin)
+    # Look up the mesh in the cache (a cache.mesh_cache):
+    cached_mesh = None
+    if cache is not None:
+        cache_key = cache.key(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, flip_face_normals, engine, precision)
+        with profile_stage(profiler, 'cache_lookup'):
+            cached_mesh = cache.load(cache_key)
 
-            # Mesh TPMS for intersection:
-            iterative_mesh, _ = mesh_shell(F, t, thickness, sizes, iterative_mesh, tols, spacing)
+    if profiler is not None:
+        # The field backend is only resolved (and imported) when the field is evaluated:
+        field_backend = field_backend_name(FIELD_BACKEND) if cached_mesh is None else None
+        profiler.info.update({'engine': engine, 'cached_mesh': cached_mesh is not None, 'workers': workers, 'replicate_cells': replicate_cells, 'field_backend': field_backend, 'k_iterations': 0})
 
-            # Check face normals orientation:
-            if flip_face_normals:
-                iterative_mesh = pv.wrap(iterative_mesh)
-                iterative_mesh.flip_normals()
-                iterative_mesh = mesh_conversion(iterative_mesh)
-            
-            # Calculate intercection:
-            iterative_mesh = trimesh.boolean.intersection((iterative_mesh, shell_bounding_box), engine = 'blender')
-            
-            # Check obtained results
-            k += k_increment
+    if cached_mesh is not None:
+        iterative_mesh = cached_mesh
+        is_watertight = True
+
+        if not silent:
+            print('Mesh loaded from cache.')
+
+    elif engine == 'native':
+        # Reduced precision is only used if its iso-surface error is within the tolerance:
+        if np.dtype(precision) != np.float64:
+            with profile_stage(profiler, 'precision_check'):
+                error = precision_error(tpms_type, tpms_design, c, thickness, cell_sizes, origin, unit_cell_mesh_resolution, precision)
+            if error > PRECISION_TOLERANCE:
+                if not silent:
+                    if np.isinf(error):
+                        print(str(precision) + ' precision changes the topology of the iso-surface, float64 is used instead.')
+                    else:
+                        print('Iso-surface error of ' + str(precision) + ' precision (' + format(error, '.1e') + ' voxels) exceeds the tolerance, float64 is used instead.')
+                precision = 'float64'
+                field = None
+
+        # Single pass: the TPMS is capped on a field padded with "outside" nodes, so no padding search is needed:
+        iterative_mesh = mesh_clipped_tpms(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, flip_face_normals, tile_budget, workers, replicate_cells, progress, field, precision, profiler, sparse)
+        if profiler is not None:
+            profiler.info.update({'k_iterations': 1, 'precision': str(precision)})
+
+        # Check obtained results
+        report_progress(progress, 'Checking watertightness', 0.95)
+        with profile_stage(profiler, 'watertight_check'):
             is_watertight = iterative_mesh.is_watertight
-            if not iterative_mesh.is_watertight:
+        if not is_watertight:
+            with profile_stage(profiler, 'fill_holes'):
                 iterative_mesh.fill_holes()
                 is_watertight = iterative_mesh.is_watertight
-    else:
+
+        # A reduced precision mesh that is still not watertight is generated again in float64:
+        if not is_watertight and np.dtype(precision) != np.float64:
+            if not silent:
+                print('The ' + str(precision) + ' mesh is not watertight, it is generated again in float64.')
+            precision = 'float64'
+            iterative_mesh = mesh_clipped_tpms(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, flip_face_normals, tile_budget, workers, replicate_cells, progress, None, precision, profiler, sparse)
+            if profiler is not None:
+                profiler.info.update({'precision': str(precision)})
+            report_progress(progress, 'Checking watertightness', 0.95)
+            with profile_stage(profiler, 'watertight_check'):
+                is_watertight = iterative_mesh.is_watertight
+
+        if not silent:
+            passes_saved = len(range(k, k_max + 1, max(k_increment, 1))) - 1
+            print('Mesh generated in a single pass (up to ' + str(passes_saved) + ' padding passes saved).')
+
+    elif engine == 'blender':
+        import trimesh
+
         # Generate bounding box:
-        bounding_box_1 = trimesh.creation.box(extents = (2 * sizes[0], 2 * sizes[1], 2 * sizes[2]), transform = None)
-        bounding_box_2 = trimesh.creation.box(extents = (sizes[0], sizes[1], sizes[2]), transform = None)
-        bounding_box = trimesh.boolean.difference((bounding_box_1, bounding_box_2), engine = 'blender')
-        
-        del bounding_box_1, bounding_box_2
-        
+        if tpms_type == 'Shell':
+            bounding_box = trimesh.creation.box(extents = (sizes[0], sizes[1], sizes[2]), transform = None)
+        else:
+            bounding_box_1 = trimesh.creation.box(extents = (2 * sizes[0], 2 * sizes[1], 2 * sizes[2]), transform = None)
+            bounding_box_2 = trimesh.creation.box(extents = (sizes[0], sizes[1], sizes[2]), transform = None)
+            bounding_box = trimesh.boolean.difference((bounding_box_1, bounding_box_2), engine = 'blender')
+            
+            del bounding_box_1, bounding_box_2
+
+        # Mesh generation iterative process:
+        k_min = k
         while not is_watertight and k <= k_max:
-            # Generation of the meshgrid:
-            X, Y, Z, tols, spacing  = generate_meshgrid(k, sizes, cell_sizes, unit_cell_mesh_resolution)
+            report_progress(progress, 'Padding iteration k = ' + str(k) + ' (up to ' + str(k_max) + ')', (k - k_min) / (k_max - k_min + 1))
+
+            # Generation of the grid axes:
+            tols, spacing = generate_axes(k, sizes, cell_sizes, unit_cell_mesh_resolution)
             
             # Generate TPMS for intersection:
-            F, t = tpms_library(X, Y, Z, c, tpms_design, cell_sizes, origin)
+            with profile_stage(profiler, 'field'):
+                F, t = tpms_field(spacing, c, tpms_design, cell_sizes, origin)
 
             # Mesh TPMS for intersection:
-            iterative_mesh, _ = mesh_skeletal(F, sizes, iterative_mesh, tols, spacing)
+            with profile_stage(profiler, 'marching_cubes'):
+                if tpms_type == 'Shell':
+                    iterative_mesh, _ = mesh_shell(F, t, thickness, sizes, iterative_mesh, tols, spacing)
+                else:
+                    iterative_mesh, _ = mesh_skeletal(F, sizes, iterative_mesh, tols, spacing)
+
+            if profiler is not None:
+                profiler.count('field', nodes = F.size)
+                profiler.peak('field', field_mb = F.nbytes / 1024**2)
+                profiler.count('marching_cubes', triangles = len(iterative_mesh.faces))
+                profiler.info['k_iterations'] += 1
+
+            del F
 
             # Check face normals orientation:
             if flip_face_normals:
-                iterative_mesh = pv.wrap(iterative_mesh)
-                iterative_mesh.flip_normals()
-                iterative_mesh = mesh_conversion(iterative_mesh)
+                iterative_mesh = flip_faces(iterative_mesh)
             
             # Calculate intercection:
-            iterative_mesh = trimesh.boolean.difference((iterative_mesh, bounding_box), engine = 'blender')
+            with profile_stage(profiler, 'boolean'):
+                if tpms_type == 'Shell':
+                    iterative_mesh = trimesh.boolean.intersection((iterative_mesh, bounding_box), engine = 'blender')
+                else:
+                    iterative_mesh = trimesh.boolean.difference((iterative_mesh, bounding_box), engine = 'blender')
             
             # Check obtained results
             k += k_increment
-            is_watertight = iterative_mesh.is_watertight
-            if not iterative_mesh.is_watertight:
-                iterative_mesh.fill_holes()
+            with profile_stage(profiler, 'watertight_check'):
                 is_watertight = iterative_mesh.is_watertight
+            if not is_watertight:
+                with profile_stage(profiler, 'fill_holes'):
+                    iterative_mesh.fill_holes()
+                    is_watertight = iterative_mesh.is_watertight
 
-    # Update output message:
-    if not silent:
-        if is_watertight:
-            print('Mesh is generated!')
-            print('The obtained mesh is watertight. If the opposite solution was desired, try using the opposite face normals direction.')
-        else:
-            print('Mesh is generated:')
-            print('Cannot obtain a watertight mesh. Try increasing unit cell mesh resolution. Please, check results carefully and treat them to solve this issue.')
-    
-    # Plot generated mesh:
-    plotter4 = pv.Plotter(window_size = [1400, 1600])
-    _ = plotter4.add_title('Generated mesh can be exported into STL format', font_size = 10)
-    _ = plotter4.add_mesh(iterative_mesh, color = True, show_edges = True)
-    _ = plotter4.show_grid()
-    plotter4.show()
+    else:
+        raise ValueError('Unknown mesh generation engine: ' + str(engine))
 
-    return iterative_mesh
+    # Face normals of closed meshes must point outwards:
+    if cached_mesh is None and is_watertight:
+        with profile_stage(profiler, 'orient_normals'):
+            iterative_mesh = orient_face_normals(iterative_mesh)
 
-# Export mesh:
-def fn_export_stl_file(iterative_mesh, file_name, directory_path, silent = False):
-    export = trimesh.exchange.stl.export_stl_ascii(iterative_mesh)
-    
-    file_path = os.path.join(directory_path, file_name + '.stl')
-    with open(file_path, 'w') as file:
-        file.write(export)
-    
-    if not silent:
-        print('\nMesh exported as .STL into ' + file_path)
+    # Only watertight meshes are cached:
+    if cache is not None and cached_mesh is None and is_watertight:
+        with profile_stage(profiler, 'cache_store'):
+            cache.store(cache_key, iterative_mesh)
 
-# SUPLEMENTARY FUNCTIONS:
-# Generate meshgrid
-def generate_meshgrid(k, sizes, cell_sizes, unit_cell_mesh_resolution):
+    if profiler is not None:
+        profiler.info.update({'triangles': len(iterative_mesh.faces), 'vertices': len(iterative_mesh.vertices), 'is_watertight': bool(is_watertight)})
+
+    report_progress(progress, 'Mesh generated', 1)
+
+    return iterative_mesh, is_watertight
+
+# Preview mesh
+# Low resolution mesh for interactive previews: up to resolution nodes per unit cell, reduced (down to 4) to
+# keep the grid within max_nodes nodes. Specimens larger than max_cells unit cells along an axis are
+# previewed on their central max_cells cells.
+def preview_mesh(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, flip_face_normals, resolution = 12, max_cells = 8, max_nodes = 200000, precision = 'float64'):
+    preview_sizes = [min(sizes[i], max_cells * cell_sizes[i]) for i in range(3)]
+    n_cells = max(preview_sizes[i] / cell_sizes[i] for i in range(3))
+    resolution = max(4, min(resolution, int(max_nodes ** (1 / 3) / n_cells)))
+
+    return mesh_clipped_tpms(tpms_type, tpms_design, c, thickness, preview_sizes, cell_sizes, origin, resolution, flip_face_normals, precision = precision)
+
+# Generation cancelled
+# Raised by progress callbacks to abort a mesh generation:
+class generation_cancelled(Exception):
+    pass
+
+# Report progress
+def report_progress(progress, message, fraction):
+    if progress is not None:
+        progress(message, fraction)
+
+# Generation profiler
+# Records the wall time, CPU time (including the worker processes that have finished) and peak RSS of
+# every stage of a generation, along with counters (nodes, triangles...) and generation details (k
+# iterations, bricks...). A stage run several times (e.g. once per brick) is accumulated. The report is
+# a JSON-serializable dict.
+class generation_profiler:
+    def __init__(self):
+        self.stages = {}
+        self.info = {}
+        self.wall_start = time.perf_counter()
+        self.cpu_start = cpu_time()
+
+    # Profile stage (context manager):
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = self.stages.setdefault(name, {'calls': 0, 'wall_time': 0, 'cpu_time': 0})
+        rss_start = peak_rss()
+        wall_start = time.perf_counter()
+        cpu_start = cpu_time()
+        try:
+            yield record
+        finally:
+            record['calls'] += 1
+            record['wall_time'] += time.perf_counter() - wall_start
+            record['cpu_time'] += cpu_time() - cpu_start
+            rss = peak_rss()
+            if rss is not None:
+                record['peak_rss_mb'] = rss
+                record['peak_rss_increase_mb'] = record.get('peak_rss_increase_mb', 0) + rss - rss_start
+
+    # Add counters to a stage:
+    def count(self, name, **counters):
+        record = self.stages.setdefault(name, {'calls': 0, 'wall_time': 0, 'cpu_time': 0})
+        for counter, value in counters.items():
+            record[counter] = record.get(counter, 0) + value
+
+    # Keep the largest values of a stage:
+    def peak(self, name, **values):
+        record = self.stages.setdefault(name, {'calls': 0, 'wall_time': 0, 'cpu_time': 0})
+        for counter, value in values.items():
+            record[counter] = max(record.get(counter, 0), value)
+
+    def report(self):
+        return {
+            'wall_time': time.perf_counter() - self.wall_start,
+            'cpu_time': cpu_time() - self.cpu_start,
+            'peak_rss_mb': peak_rss(),
+            'info': dict(self.info),
+            'stages': [dict(stage = name, **record) for name, record in self.stages.items()]}
+
+    def summary(self):
+        return profile_summary(self.report())
+
+    def save(self, file_path):
+        with open(file_path, 'w') as file:
+            json.dump(self.report(), file, indent = 4)
+
+# Profile summary
+# Profiling report as a table:
+def profile_summary(report):
+    lines = ['{:18s} {:>6s} {:>10s} {:>10s} {:>10s}   {}'.format('stage', 'calls', 'wall [s]', 'cpu [s]', 'rss [MB]', 'counters')]
+    for stage in report['stages']:
+        counters = ', '.join(name + ' = ' + format(value, '.6g') for name, value in stage.items() if name not in ('stage', 'calls', 'wall_time', 'cpu_time', 'peak_rss_mb', 'peak_rss_increase_mb'))
+        rss = stage.get('peak_rss_mb')
+        lines.append('{:18s} {:6d} {:10.3f} {:10.3f} {:>10s}   {}'.format(stage['stage'], stage['calls'], stage['wall_time'], stage['cpu_time'], format(rss, '.0f') if rss is not None else '-', counters))
+    lines.append('{:18s} {:6s} {:10.3f} {:10.3f}'.format('total', '', report['wall_time'], report['cpu_time']))
+    lines.append(', '.join(name + ' = ' + str(value) for name, value in report['info'].items()))
+
+    return '\n'.join(lines)
+
+# Profile stage
+# Profiles a stage when a profiler is given:
+@contextlib.contextmanager
+def profile_stage(profiler, name):
+    if profiler is None:
+        yield None
+    else:
+        with profiler.stage(name) as record:
+            yield record
+
+# CPU time of this process and its finished child processes (in s):
+def cpu_time():
+    try:
+        import resource
+    except ImportError:
+        return time.process_time()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+# Peak resident set size of this process (in MB, None where it is not available):
+def peak_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Bytes on macOS, kilobytes elsewhere:
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+# Flip faces
+# Reverses the vertex order of every face, which flips the face normals without any mesh conversion:
+def flip_faces(mesh):
+    import trimesh
+
+    return trimesh.Trimesh(vertices = mesh.vertices, faces = mesh.faces[:, ::-1], process = False)
+
+# Orient face normals
+# The signed volume of a closed and consistently wound mesh is negative when its normals point inwards:
+def orient_face_normals(mesh):
+    if mesh.is_winding_consistent and signed_volume(mesh.vertices, mesh.faces) < 0:
+        mesh = flip_faces(mesh)
+
+    return mesh
+
+# Signed volume
+# Sum of the signed volumes of the tetrahedra formed by every face and the origin:
+def signed_volume(vertices, faces):
+    v0 = vertices[faces[:, 0]]
+    v1 = vertices[faces[:, 1]]
+    v2 = vertices[faces[:, 2]]
+
+    return np.einsum('ij,ij->', v0, np.cross(v1, v2)) / 6
+
+# Write binary STL
+# Streams the triangles to the file in chunks of chunk_size records (50 bytes each: normal, three vertices
+# and attribute byte count), reusing a single buffer, so that the extra memory does not grow with the mesh.
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attributes', '<u2')])
+
+def write_binary_stl(file_path, vertices, faces, chunk_size = 65536, header = b'TPMSgen binary STL'):
+    buffer = np.zeros(chunk_size, dtype = STL_RECORD)
+
+    with open(file_path, 'wb') as file:
+        file.write(header[:80].ljust(80, b' '))
+        file.write(np.uint32(len(faces)).tobytes())
+
+        for start in range(0, len(faces), chunk_size):
+            triangles = vertices[faces[start:start + chunk_size]]
+            n = len(triangles)
+
+            normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+            lengths = np.linalg.norm(normals, axis = 1, keepdims = True)
+            np.divide(normals, lengths, out = normals, where = lengths > 0)
+
+            buffer['normal'][:n] = normals
+            buffer['vertices'][:n] = triangles
+            file.write(memoryview(buffer[:n]).cast('B'))
+
+# Generate grid axes
+def generate_axes(k, sizes, cell_sizes, unit_cell_mesh_resolution):
     tol_x = k * cell_sizes[0] / unit_cell_mesh_resolution
     tol_y = k * cell_sizes[1] / unit_cell_mesh_resolution
     tol_z = k * cell_sizes[2] / unit_cell_mesh_resolution
@@ -199,54 +607,572 @@ def generate_meshgrid(k, sizes, cell_sizes, unit_cell_mesh_resolution):
     yl = np.linspace(-sizes[1]/2 - tols[1], sizes[1]/2 + tols[1], int(sizes[1] / cell_sizes[1]) * unit_cell_mesh_resolution + 2 * k + 1)
     zl = np.linspace(-sizes[2]/2 - tols[2], sizes[2]/2 + tols[2], int(sizes[2] / cell_sizes[2]) * unit_cell_mesh_resolution + 2 * k + 1)
     spacing = [xl, yl, zl]
+
+    return tols, spacing
+
+# Generate meshgrid
+def generate_meshgrid(k, sizes, cell_sizes, unit_cell_mesh_resolution):
+    tols, spacing = generate_axes(k, sizes, cell_sizes, unit_cell_mesh_resolution)
     
-    Y, X, Z = np.meshgrid(yl, xl, zl)
+    Y, X, Z = np.meshgrid(spacing[1], spacing[0], spacing[2])
 
     return X, Y, Z, tols, spacing  
 
-# Mesh conversion
-def mesh_conversion(mesh_pv):
-    faces_as_array = mesh_pv.faces.reshape((mesh_pv.n_faces, 4))[:, 1:]
-    mesh = trimesh.Trimesh(mesh_pv.points, faces_as_array)
+# Vertex offset from grid indices to the centered bounding box
+def vertex_offset(sizes, tols):
+    return np.array([sizes[0]/2 + tols[0], sizes[1]/2 + tols[1], sizes[2]/2 + tols[2]])
+
+# Solid field
+# Returns a field that is negative inside the solid TPMS. By default (as with the marching-cubes
+# winding) the solid is the shell |F| <= thickness * t or the F < 0 region of skeletal designs;
+# flipping the face normals selects the opposite solution. F is overwritten.
+def solid_field(F, t, tpms_type, thickness, flip_face_normals):
+    if tpms_type == 'Shell':
+        S = np.abs(F, out = F)
+        S -= thickness * t
+    else:
+        S = F
+
+    if flip_face_normals:
+        np.negative(S, out = S)
+
+    return S
+
+# Lipschitz constant of the TPMS field (upper bound of |grad F|)
+def field_lipschitz(tpms_design, cell_sizes):
+    design = TPMS_DESIGNS[tpms_design]
+    frequencies = {None: 0, 'sin': 1, 'cos': 1, 'sin2': 2, 'cos2': 2}
+
+    gradient = [0, 0, 0]
+    for coefficient, *names in design['terms']:
+        for i, name in enumerate(names):
+            gradient[i] += abs(coefficient) * frequencies[name] * 2 * np.pi / cell_sizes[i]
+
+    return np.sqrt(gradient[0]**2 + gradient[1]**2 + gradient[2]**2)
+
+# Clip solid field
+# Intersects the solid with the bounding box by taking max(S, L * B), B being the box signed
+# distance along each axis and L the Lipschitz constant of S, so that the box faces are captured by
+# the linear ramp of L * B wherever they cut through the solid. The box is grown by a tiny fraction
+# of a voxel so that no node lying exactly on a face ends up with a zero value.
+def clip_field(S, spacing, sizes, lipschitz):
+    for i in range(3):
+        voxel = np.diff(spacing[i])[0]
+        distance = (np.abs(spacing[i]) - sizes[i]/2 - 1e-4 * voxel) * lipschitz
+
+        broadcast_shape = [1, 1, 1]
+        broadcast_shape[i] = len(spacing[i])
+        np.maximum(S, distance.astype(S.dtype, copy = False).reshape(broadcast_shape), out = S)
+
+    return S
+
+# Mesh clipped TPMS
+# Evaluates the field on the bounding box grid (whose end nodes lie on the box faces) plus one extra
+# layer of nodes per side. Those nodes are set to a constant "outside" value, which closes the surface
+# and keeps the caps on the box faces. With a tile budget (in MB), the grid is processed brick by brick
+# and the bricks, which share their boundary nodes, are stitched by welding the seam vertices. With
+# several workers, bricks (or slabs of the grid when no budget is set) are meshed in a process pool.
+# With replicate_cells, the unit cells that are not affected by the clipping are copied from a single
+# cached unit cell mesh, and only the slabs along the bounding box faces are meshed. A field (F, t) already
+# evaluated on the bounding box grid is reused instead of evaluating it again (only in this process and
+# without replicate_cells, whose bricks are evaluated on periodic coordinates). The field is evaluated and
+# meshed in the given precision, while vertices are computed and welded in float64. With sparse, marching
+# cubes only visits the blocks of cubes that may contain the surface.
+def mesh_clipped_tpms(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, flip_face_normals, tile_budget = None, workers = 1, replicate_cells = False, progress = None, field = None, precision = 'float64', profiler = None, sparse = False):
+    import trimesh
+
+    _, spacing = generate_axes(0, sizes, cell_sizes, unit_cell_mesh_resolution)
+    voxels = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]]
+    lipschitz = field_lipschitz(tpms_design, cell_sizes)
+
+    # The padded grid starts one voxel outside the bounding box:
+    padded_spacing = [np.concatenate(([spacing[i][0] - voxels[i]], spacing[i], [spacing[i][-1] + voxels[i]])) for i in range(3)]
+    shape = [len(padded_spacing[0]), len(padded_spacing[1]), len(padded_spacing[2])]
+
+    interior = None
+    if replicate_cells:
+        bound = field_bound(tpms_type, tpms_design, c, thickness)
+        interior = replication_interior(sizes, cell_sizes, unit_cell_mesh_resolution, voxels, shape, bound, lipschitz)
+
+    if interior is None:
+        # With a progress callback, slabs are also used to report progress and check for cancellation:
+        n_slabs = 4 * workers if workers > 1 else (1 if progress is None else 8)
+        bricks = grid_bricks(shape, tile_budget, n_slabs, bytes_per_node(precision))
+        period = None
+    else:
+        bricks = remainder_bricks(shape, interior, tile_budget, bytes_per_node(precision))
+        period = unit_cell_mesh_resolution
+        field = None
+
+    if workers > 1 and len(bricks) > 1:
+        field = None
+
+    if profiler is not None:
+        profiler.info.update({'grid_nodes': int(np.prod(shape)), 'bricks': len(bricks), 'field_reused': field is not None})
+
+    # Mesh bricks:
+    mesh_function = functools.partial(mesh_brick, tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, flip_face_normals, lipschitz, padded_spacing, period = period, precision = precision, sparse = sparse)
+    results = []
+    report_progress(progress, 'Evaluating field and marching cubes (0/' + str(len(bricks)) + ' bricks)', 0)
+    with profile_stage(profiler, 'bricks'):
+        if workers > 1 and len(bricks) > 1:
+            # Bricks meshed by other processes are only profiled as a whole:
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                try:
+                    for result in executor.map(mesh_function, bricks):
+                        results.append(result)
+                        report_progress(progress, 'Evaluating field and marching cubes (' + str(len(results)) + '/' + str(len(bricks)) + ' bricks)', 0.8 * len(results) / len(bricks))
+                except generation_cancelled:
+                    executor.shutdown(wait = False, cancel_futures = True)
+                    raise
+        else:
+            for brick in bricks:
+                if field is None:
+                    results.append(mesh_function(brick, profiler = profiler))
+                else:
+                    results.append(mesh_function(brick, field = (padded_field(field[0], brick), field[1]), profiler = profiler))
+                report_progress(progress, 'Evaluating field and marching cubes (' + str(len(results)) + '/' + str(len(bricks)) + ' bricks)', 0.8 * len(results) / len(bricks))
+    results = [(brick_vertices, brick_faces, np.ones(len(brick_vertices), dtype = bool)) for brick_vertices, brick_faces in results]
+
+    # Replicate the unit cell mesh:
+    if interior is not None:
+        report_progress(progress, 'Replicating unit cells', 0.8)
+        with profile_stage(profiler, 'replicate'):
+            cell_vertices, cell_faces = mesh_unit_cell(tpms_type, tpms_design, c, thickness, tuple(sizes), tuple(cell_sizes), tuple(origin), unit_cell_mesh_resolution, flip_face_normals, precision)
+            results += replicate_unit_cell(cell_vertices, cell_faces, interior, padded_spacing, unit_cell_mesh_resolution)
+
+    vertices = []
+    faces = []
+    candidates = []
+    n_vertices = 0
+    for brick_vertices, brick_faces, brick_candidates in results:
+        vertices.append(brick_vertices)
+        faces.append(brick_faces + n_vertices)
+        candidates.append(brick_candidates)
+        n_vertices += len(brick_vertices)
+
+    del results
+
+    vertices = np.concatenate(vertices)
+    faces = np.concatenate(faces)
+    candidates = np.concatenate(candidates)
+    report_progress(progress, 'Welding vertices', 0.85)
+    if profiler is not None:
+        profiler.count('weld', vertices = len(vertices))
+    with profile_stage(profiler, 'weld'):
+        vertices, faces = weld_vertices(vertices, faces, 1e-6 * min(voxels), candidates)
+
+        # Vertices are already welded, so trimesh does not need to merge them again:
+        mesh = trimesh.Trimesh(vertices = vertices, faces = faces, process = False)
+
+    del vertices, faces, candidates
 
     return mesh
 
+# Mesh brick
+# Meshes the nodes of the padded grid selected by brick (a tuple of three slices). With a period (in
+# nodes), the field is evaluated on the coordinates of the first unit cell, so that it is bitwise
+# periodic and replicated unit cells match the meshed bricks exactly along their seams. A given field
+# (F, t) on the brick nodes is used, and overwritten, instead of evaluating it. With sparse (only with
+# clip), the cubes of the blocks that cannot contain the surface are skipped by marching cubes.
+def mesh_brick(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, flip_face_normals, lipschitz, padded_spacing, brick, period = None, clip = True, field = None, precision = 'float64', profiler = None, sparse = False):
+    from skimage import measure
+
+    brick_spacing = [padded_spacing[i][brick[i]] for i in range(3)]
+    voxels = [np.diff(padded_spacing[0])[0], np.diff(padded_spacing[1])[0], np.diff(padded_spacing[2])[0]]
+
+    if period is None:
+        field_spacing = brick_spacing
+    else:
+        field_spacing = [padded_spacing[i][1 + (np.arange(brick[i].start, brick[i].stop) - 1) % period] for i in range(3)]
+
+    with profile_stage(profiler, 'field'):
+        if field is None:
+            F, t = tpms_field(field_spacing, c, tpms_design, cell_sizes, origin, precision)
+        else:
+            F, t = field
+        S = solid_field(F, t, tpms_type, thickness, flip_face_normals)
+
+        if clip:
+            clip_field(S, brick_spacing, sizes, lipschitz)
+
+            # Padding layer:
+            outside = lipschitz * max(voxels)
+            for i in range(3):
+                if brick[i].start == 0:
+                    S[(slice(None),) * i + (0,)] = outside
+                if brick[i].stop == len(padded_spacing[i]):
+                    S[(slice(None),) * i + (-1,)] = outside
+
+        separate_zeros(S, field_lipschitz(tpms_design, cell_sizes), voxels)
+
+    if profiler is not None:
+        profiler.count('field', nodes = S.size)
+        profiler.peak('field', field_mb = S.nbytes / 1024**2)
+
+    # Bricks that do not contain the surface:
+    if S.min() >= 0 or S.max() <= 0:
+        return np.empty((0, 3)), np.empty((0, 3), dtype = np.int64)
+
+    mask = None
+    if sparse and clip:
+        with profile_stage(profiler, 'sparse_mask'):
+            mask = sparse_mask(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, flip_face_normals, lipschitz, brick_spacing)
+        if profiler is not None:
+            profiler.count('sparse_mask', active_cubes = np.count_nonzero(mask))
+
+    # The default marching-cubes winding makes the face normals point out of the S < 0 region:
+    with profile_stage(profiler, 'marching_cubes'):
+        vertices, faces, _, _ = measure.marching_cubes(S, 0, mask = mask)
+        vertices = refine_vertices(S, vertices)
+        vertices += [brick[0].start, brick[1].start, brick[2].start]
+        vertices *= voxels
+        vertices += [padded_spacing[0][0], padded_spacing[1][0], padded_spacing[2][0]]
+
+    if profiler is not None:
+        profiler.count('marching_cubes', triangles = len(faces))
+
+    del F, S, mask
+
+    return vertices, faces
+
+# Separate zeros
+# Moves the nodes where S is zero, or closer to zero than ZERO_MARGIN voxels (|S| < ZERO_MARGIN * L * voxel),
+# off the iso-level, keeping their sign (zeros are "outside"). Otherwise marching cubes places vertices on
+# (or, once rounded to float32, onto) grid nodes, where the faces of neighbouring cubes, bricks and unit
+# cells collapse when welded and leave non-manifold edges. Every vertex then lies at least about
+# ZERO_MARGIN of its edge away from the nodes. The iso-surface moves by less than ZERO_MARGIN voxels.
+ZERO_MARGIN = 1e-4
+
+def separate_zeros(S, lipschitz, voxels):
+    margin = S.dtype.type(ZERO_MARGIN * lipschitz * max(voxels))
+    small = (S > -margin) & (S < margin)
+    S[small] = np.where(S[small] < 0, -margin, margin)
+
+    return S
+
+# Padded field
+# Copy of the nodes of a brick of the padded grid from a field evaluated on the bounding box grid. The
+# padding layer is left at zero, as it is overwritten by the "outside" value.
+def padded_field(F, brick):
+    brick_field = np.zeros([brick[i].stop - brick[i].start for i in range(3)], dtype = F.dtype)
+    source = tuple(slice(max(brick[i].start - 1, 0), min(brick[i].stop - 1, F.shape[i])) for i in range(3))
+    target = tuple(slice(source[i].start + 1 - brick[i].start, source[i].stop + 1 - brick[i].start) for i in range(3))
+    brick_field[target] = F[source]
+
+    return brick_field
+
+# Refine vertices
+# marching_cubes returns float32 vertices (in grid units) whose rounding depends on their position in the
+# brick. The vertices on grid edges (at least two integer coordinates, unlike the vertices added inside
+# ambiguous cubes) are recomputed in float64 from the node values along their edge, so that the vertices
+# shared by neighbouring bricks and replicated unit cells match within the weld tolerance.
+def refine_vertices(S, vertices):
+    integer = vertices == np.round(vertices)
+    rows = np.flatnonzero(np.count_nonzero(integer, axis = 1) >= 2)
+
+    # Edge of every vertex (along its non-integer coordinate), with 32-bit node indices to save memory:
+    axis = np.argmin(integer[rows], axis = 1)
+    del integer
+    edges = np.arange(len(rows))
+    lower = np.floor(vertices[rows]).astype(np.int32)
+    upper = lower.copy()
+    upper[edges, axis] = np.minimum(upper[edges, axis] + 1, np.array(S.shape)[axis] - 1)
+
+    S0 = S[lower[:, 0], lower[:, 1], lower[:, 2]].astype(np.float64)
+    S1 = S[upper[:, 0], upper[:, 1], upper[:, 2]].astype(np.float64)
+    del upper
+    t = np.divide(S0, S0 - S1, out = np.zeros(len(rows)), where = S0 != S1)
+    del S0, S1
+
+    vertices = vertices.astype(np.float64)
+    vertices[rows] = lower
+    vertices[rows, axis] += t
+
+    return vertices
+
+# Bytes per node
+# Memory needed to evaluate and mesh the field: the field, a scratch array (none with a fused field
+# kernel), the working memory of marching_cubes and the float32 copy of the field it makes (none for a
+# float32 field).
+def bytes_per_node(precision = 'float64'):
+    itemsize = np.dtype(precision).itemsize
+    arrays = 1 if field_kernel(FIELD_BACKEND) is not None else 2
+
+    return arrays * itemsize + 4 + (4 if itemsize != 4 else 0)
+
+# Precision error
+# Largest displacement (in voxels) of the iso-surface vertices caused by evaluating the field in the
+# given precision instead of float64. The vertex on every grid edge crossed by the surface lies at
+# S0 / (S0 - S1) of the edge, so the error is measured on those fractions over one unit cell (the field
+# is periodic). The nodes are separated from zero (see separate_zeros) as for meshing. The error is
+# infinite if any node changes sign, as the marching cubes topology would then differ from float64 and
+# the mesh may not be watertight. It must not exceed PRECISION_TOLERANCE for the precision to be used.
+PRECISION_TOLERANCE = 1e-3
+
+def precision_error(tpms_type, tpms_design, c, thickness, cell_sizes, origin, unit_cell_mesh_resolution, precision):
+    _, spacing = generate_axes(0, cell_sizes, cell_sizes, unit_cell_mesh_resolution)
+    voxels = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]]
+    lipschitz = field_lipschitz(tpms_design, cell_sizes)
+
+    F, t = tpms_field(spacing, c, tpms_design, cell_sizes, origin)
+    S_reference = separate_zeros(solid_field(F, t, tpms_type, thickness, False), lipschitz, voxels)
+    F, t = tpms_field(spacing, c, tpms_design, cell_sizes, origin, precision)
+    S = separate_zeros(solid_field(F, t, tpms_type, thickness, False), lipschitz, voxels).astype(np.float64)
+
+    if np.any((S_reference < 0) != (S < 0)):
+        return np.inf
+
+    error = 0
+    for i in range(3):
+        lower = (slice(None),) * i + (slice(None, -1),)
+        upper = (slice(None),) * i + (slice(1, None),)
+        crossed = (S_reference[lower] < 0) != (S_reference[upper] < 0)
+        if not crossed.any():
+            continue
+
+        S0 = S_reference[lower][crossed]
+        S1 = S_reference[upper][crossed]
+        S0_precision = S[lower][crossed]
+        S1_precision = S[upper][crossed]
+        fraction = S0 / (S0 - S1)
+        fraction_precision = np.divide(S0_precision, S0_precision - S1_precision, out = np.ones(len(S0)), where = S0_precision != S1_precision)
+        error = max(error, np.abs(fraction_precision - fraction).max())
+
+    return error
+
+# Grid bricks
+# Splits a grid of nodes into bricks of at most tile_budget MB (bytes_per_node bytes per node) or,
+# without a budget, into n_slabs slabs along X. Neighbouring bricks share one layer of nodes.
+def grid_bricks(shape, tile_budget = None, n_slabs = 1, bytes_per_node = 24):
+    if tile_budget is None:
+        n_slabs = max(1, min(n_slabs, shape[0] - 1))
+        bounds = np.linspace(0, shape[0] - 1, n_slabs + 1).round().astype(int)
+        return [(slice(bounds[i], bounds[i + 1] + 1), slice(0, shape[1]), slice(0, shape[2])) for i in range(n_slabs)]
+
+    edge = max(2, int((tile_budget * 1024**2 / bytes_per_node) ** (1 / 3)))
+    ranges = [[slice(start, min(start + edge, n)) for start in range(0, n - 1, edge - 1)] for n in shape]
+
+    return [(x, y, z) for x in ranges[0] for y in ranges[1] for z in ranges[2]]
+
+# Sparse mask
+# Cubes of a brick that may contain the surface, as the mask taken by marching_cubes (True at the last
+# node of every active cube). Cubes are grouped into blocks of SPARSE_BLOCK cubes per axis. The clipped
+# solid field is L-Lipschitz (as its clipping ramp L * B), so it cannot change sign within a block whose
+# half diagonal is r if |S| > L * r at the block centre. S is only evaluated at the block centres, and the
+# bound is widened by a thousandth of the largest voxel to cover rounding (and reduced precision) errors
+# and the nodes moved off the iso-level by separate_zeros. The padding nodes need no special case: their
+# distance to the box makes S at least -L * r at the centre of any block that holds them, and they are
+# set to a positive "outside" value.
+SPARSE_BLOCK = 4
+
+def sparse_mask(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, flip_face_normals, lipschitz, brick_spacing):
+    voxels = [np.diff(brick_spacing[0])[0], np.diff(brick_spacing[1])[0], np.diff(brick_spacing[2])[0]]
+    shape = [len(brick_spacing[0]), len(brick_spacing[1]), len(brick_spacing[2])]
+
+    centres = []
+    radii = 0
+    for i in range(3):
+        lower = brick_spacing[i][0:shape[i] - 1:SPARSE_BLOCK]
+        upper = brick_spacing[i][np.minimum(np.arange(SPARSE_BLOCK, shape[i] - 1 + SPARSE_BLOCK, SPARSE_BLOCK), shape[i] - 1)]
+        centres.append((lower + upper) / 2)
+
+        broadcast_shape = [1, 1, 1]
+        broadcast_shape[i] = len(lower)
+        radii = radii + ((upper - lower) / 2).reshape(broadcast_shape)**2
+
+    F, t = tpms_field(centres, c, tpms_design, cell_sizes, origin)
+    S = solid_field(F, t, tpms_type, thickness, flip_face_normals)
+
+    # Clipping (as clip_field):
+    for i in range(3):
+        broadcast_shape = [1, 1, 1]
+        broadcast_shape[i] = len(centres[i])
+        np.maximum(S, ((np.abs(centres[i]) - sizes[i]/2 - 1e-4 * voxels[i]) * lipschitz).reshape(broadcast_shape), out = S)
+
+    active = np.abs(S) <= lipschitz * (np.sqrt(radii) + 1e-3 * max(voxels))
+
+    # Cubes of the active blocks (the first node layer ends no cube):
+    mask = np.zeros(shape, dtype = bool)
+    mask[1:, 1:, 1:] = active.repeat(SPARSE_BLOCK, 0)[:shape[0] - 1].repeat(SPARSE_BLOCK, 1)[:, :shape[1] - 1].repeat(SPARSE_BLOCK, 2)[:, :, :shape[2] - 1]
+
+    return mask
+
+# Upper bound of |S|
+def field_bound(tpms_type, tpms_design, c, thickness):
+    design = TPMS_DESIGNS[tpms_design]
+    bound = sum(abs(coefficient) for coefficient, *_ in design['terms']) + abs(design['constant'] - c)
+    if tpms_type == 'Shell':
+        bound += thickness * design['t']
+
+    return bound
+
+# Replication interior
+# Returns, per axis, the first and last padded node indices of the region where clipping leaves the
+# field untouched (L * B < -bound further than bound / L from the box faces), or None when the grid is
+# not aligned with the unit cells or that region does not hold a full unit cell.
+def replication_interior(sizes, cell_sizes, unit_cell_mesh_resolution, voxels, shape, bound, lipschitz):
+    interior = []
+    for i in range(3):
+        n_cells = int(sizes[i] / cell_sizes[i])
+        if abs(n_cells * cell_sizes[i] - sizes[i]) > 1e-9 * sizes[i]:
+            return None
+
+        margin = int(np.ceil(bound / (lipschitz * voxels[i]))) + 1
+        first, last = margin, shape[i] - 3 - margin
+        if (int(np.ceil(first / unit_cell_mesh_resolution)) + 1) * unit_cell_mesh_resolution > last:
+            return None
+        interior.append((first + 1, last + 1))
+
+    return interior
+
+# Remainder bricks
+# Splits the padded grid outside the replication interior into the 26 bricks around it.
+def remainder_bricks(shape, interior, tile_budget = None, bytes_per_node = 24):
+    segments = [[slice(0, interior[i][0] + 1), slice(interior[i][0], interior[i][1] + 1), slice(interior[i][1], shape[i])] for i in range(3)]
+
+    bricks = []
+    for a, x in enumerate(segments[0]):
+        for b, y in enumerate(segments[1]):
+            for d, z in enumerate(segments[2]):
+                if (a, b, d) == (1, 1, 1):
+                    continue
+                brick = (x, y, z)
+                for sub_brick in grid_bricks([x.stop - x.start, y.stop - y.start, z.stop - z.start], tile_budget, bytes_per_node = bytes_per_node):
+                    bricks.append(tuple(slice(brick[i].start + sub_brick[i].start, brick[i].start + sub_brick[i].stop) for i in range(3)))
+
+    return bricks
+
+# Mesh unit cell
+# Meshes (and caches) one unit cell of the periodic field, with vertices relative to the cell corner.
+@functools.lru_cache(maxsize = 16)
+def mesh_unit_cell(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, unit_cell_mesh_resolution, flip_face_normals, precision = 'float64'):
+    _, spacing = generate_axes(0, sizes, cell_sizes, unit_cell_mesh_resolution)
+    voxels = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]]
+    padded_spacing = [np.concatenate(([spacing[i][0] - voxels[i]], spacing[i], [spacing[i][-1] + voxels[i]])) for i in range(3)]
+
+    cell = (slice(1, unit_cell_mesh_resolution + 2),) * 3
+    vertices, faces = mesh_brick(tpms_type, tpms_design, c, thickness, sizes, cell_sizes, origin, flip_face_normals, None, padded_spacing, cell, period = unit_cell_mesh_resolution, clip = False, precision = precision)
+    vertices, faces = weld_vertices(vertices, faces, 1e-6 * min(voxels))
+    vertices -= [padded_spacing[0][1], padded_spacing[1][1], padded_spacing[2][1]]
+
+    vertices.setflags(write = False)
+    faces.setflags(write = False)
+
+    return vertices, faces
+
+# Replicate unit cell
+# Copies the unit cell mesh over the replication interior. Whole cells are copied with all their faces
+# and partial cells along the interior boundary with the faces of the cubes inside it. Only vertices on
+# cell boundaries (and in partial cells) are flagged as candidates for welding.
+def replicate_unit_cell(cell_vertices, cell_faces, interior, padded_spacing, unit_cell_mesh_resolution):
+    res = unit_cell_mesh_resolution
+    voxels = [np.diff(padded_spacing[0])[0], np.diff(padded_spacing[1])[0], np.diff(padded_spacing[2])[0]]
+
+    # Cube (within the cell) of every face and vertices on the cell boundary:
+    local = cell_vertices / voxels
+    cubes = np.clip(np.floor(local[cell_faces].mean(axis = 1)).astype(int), 0, res - 1)
+    on_boundary = np.any((np.abs(local) < 1e-6) | (np.abs(local - res) < 1e-6), axis = 1)
+
+    # Cells along each axis as (first padded node, first cube, last cube + 1):
+    pieces = []
+    for i in range(3):
+        first, last = interior[i]
+        axis_pieces = []
+        corner = first - (first - 1) % res
+        while corner < last:
+            axis_pieces.append((corner, max(first - corner, 0), min(last - corner, res)))
+            corner += res
+        pieces.append(axis_pieces)
+
+    results = []
+    full_corners = []
+    for x in pieces[0]:
+        for y in pieces[1]:
+            for z in pieces[2]:
+                cell = (x, y, z)
+                corner = [padded_spacing[i][cell[i][0]] for i in range(3)]
+                if all(piece[1] == 0 and piece[2] == res for piece in cell):
+                    full_corners.append(corner)
+                    continue
+
+                # Partial cell:
+                selected = np.all([(cubes[:, i] >= cell[i][1]) & (cubes[:, i] < cell[i][2]) for i in range(3)], axis = 0)
+                used, faces = np.unique(cell_faces[selected], return_inverse = True)
+                results.append((cell_vertices[used] + corner, faces.reshape(-1, 3), np.ones(len(used), dtype = bool)))
+
+    # Whole cells:
+    if full_corners:
+        full_corners = np.array(full_corners)
+        vertices = (cell_vertices[np.newaxis] + full_corners[:, np.newaxis]).reshape(-1, 3)
+        faces = (cell_faces[np.newaxis] + (np.arange(len(full_corners)) * len(cell_vertices))[:, np.newaxis, np.newaxis]).reshape(-1, 3)
+        results.append((vertices, faces, np.tile(on_boundary, len(full_corners))))
+
+    return results
+
+# Weld vertices
+# Merges vertices closer than tolerance (e.g. duplicated along brick seams) and drops the faces that
+# collapse. Only the candidate vertices (all by
+# default) are considered. They are grouped by their coordinates rounded to the tolerance, hashed into one
+# integer; a second pass on a grid shifted by half the tolerance catches the pairs that straddle a
+# rounding boundary.
+def weld_vertices(vertices, faces, tolerance, candidates = None):
+    representatives = np.arange(len(vertices))
+    indices = representatives if candidates is None else np.flatnonzero(candidates)
+    for shift in (0, 0.5):
+        keys = np.floor(vertices[indices] / tolerance + shift).astype(np.int64)
+        hashes = keys[:, 0] * 73856093 + keys[:, 1] * 19349663 + keys[:, 2] * 83492791
+
+        order = np.argsort(hashes)
+        sorted_hashes = hashes[order]
+        first = np.ones(len(order), dtype = bool)
+        first[1:] = sorted_hashes[1:] != sorted_hashes[:-1]
+        inverse = np.empty(len(order), dtype = np.int64)
+        inverse[order] = np.cumsum(first) - 1
+        index = order[first]
+
+        # Hash collisions between different keys fall back to a row-wise unique:
+        merged = index[inverse] != np.arange(len(indices))
+        if not np.array_equal(keys[merged], keys[index[inverse[merged]]]):
+            _, index, inverse = np.unique(keys, axis = 0, return_index = True, return_inverse = True)
+            inverse = inverse.reshape(-1)
+
+        mapping = np.arange(len(vertices))
+        mapping[indices] = indices[index][inverse]
+        representatives = mapping[representatives]
+        indices = indices[index]
+
+    used = representatives == np.arange(len(vertices))
+    new_indices = np.cumsum(used) - 1
+    vertices = vertices[used]
+    faces = new_indices[representatives[faces]]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+
+    return vertices, faces
+
 # Mesh Shell
+# The shell is the region |F| <= thickness * t, so both of its faces are the zero level of |F| - thickness * t
+# and are extracted in a single marching-cubes pass:
 def mesh_shell(F, t, thickness, sizes, mesh, tols, spacing):
-    vertices_positive, faces_positive, vertex_normals_positive, _ = measure.marching_cubes(F, thickness * t, spacing = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]])
-    vertices_negative, faces_negative, vertex_normals_negative, _ = measure.marching_cubes(F, -thickness * t, spacing = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]])
+    import trimesh
+    from skimage import measure
 
-    for i, vert in enumerate(vertices_positive):
-        vertices_positive[i, 0] = vert[0] - sizes[0]/2 - tols[0]
-        vertices_positive[i, 1] = vert[1] - sizes[1]/2 - tols[1]
-        vertices_positive[i, 2] = vert[2] - sizes[2]/2 - tols[2]
+    vertices, faces, _, _ = measure.marching_cubes(np.abs(F) - thickness * t, 0, spacing = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]])
+    vertices -= vertex_offset(sizes, tols)
 
-    for i, vert in enumerate(vertices_negative):
-        vertices_negative[i, 0] = vert[0] - sizes[0]/2 - tols[0]
-        vertices_negative[i, 1] = vert[1] - sizes[1]/2 - tols[1]
-        vertices_negative[i, 2] = vert[2] - sizes[2]/2 - tols[2]
-
-    vertices = np.concatenate((vertices_positive, vertices_negative))
-    
-    mesh_1 = trimesh.Trimesh(vertices = vertices_positive, faces = faces_positive, vertex_normals = vertex_normals_positive)
-    mesh_2 = trimesh.Trimesh(vertices = vertices_negative, faces = faces_negative, vertex_normals = vertex_normals_negative)
-    mesh_2 = pv.wrap(mesh_2)
-    mesh_2.flip_normals()
-    mesh_2 = mesh_conversion(mesh_2)
+    mesh = trimesh.Trimesh(vertices = vertices, faces = faces)
 
-    mesh = trimesh.util.concatenate((mesh_1, mesh_2))
-    
-    del vertices_positive, faces_positive, vertex_normals_positive, vertices_negative, faces_negative, vertex_normals_negative, mesh_1, mesh_2
+    del faces
 
     return mesh, vertices
 
 # Mesh Skeletal
 def mesh_skeletal(F, sizes, mesh, tols, spacing):
+    import trimesh
+    from skimage import measure
+
     vertices, faces, _, _ = measure.marching_cubes(F, 0, spacing = [np.diff(spacing[0])[0], np.diff(spacing[1])[0], np.diff(spacing[2])[0]])
-    for i, vert in enumerate(vertices):
-        vertices[i, 0] = vert[0] - sizes[0]/2 - tols[0]
-        vertices[i, 1] = vert[1] - sizes[1]/2 - tols[1]
-        vertices[i, 2] = vert[2] - sizes[2]/2 - tols[2]
+    vertices -= vertex_offset(sizes, tols)
     
     mesh = trimesh.Trimesh(vertices = vertices, faces = faces)
 
@@ -298,4 +1224,226 @@ def tpms_library(X, Y, Z, c, tpms_design, cell_sizes, origin, silent = False):
         F = 0
         t = 0
 
-    return F, t
\ No newline at end of file
+    return F, t
+
+# TPMS library (separable form)
+# Every built-in design is a sum of products of 1-D trigonometric functions. Each term is
+# stored as (coefficient, x function, y function, z function), None meaning a factor of 1.
+TPMS_DESIGNS = {
+    'Skeletal-TPMS Schoen gyroid': {
+        'terms': [(1, 'cos', 'sin', None), (1, None, 'cos', 'sin'), (1, 'sin', None, 'cos')],
+        'constant': 0,
+        't': 0.125},
+    'Skeletal-TPMS Schwarz diamond': {
+        'terms': [(1, 'cos', 'cos', 'cos'), (1, 'sin', 'sin', 'sin')],
+        'constant': 0,
+        't': 0},
+    'Skeletal-TPMS Schwarz primitive (pinched)': {
+        'terms': [(1, 'cos', None, None), (1, None, 'cos', None), (1, None, None, 'cos')],
+        'constant': 0,
+        't': 0},
+    'Skeletal-TPMS Schwarz primitive': {
+        'terms': [(1, 'cos', None, None), (1, None, 'cos', None), (1, None, None, 'cos')],
+        'constant': 0,
+        't': 0},
+    'Skeletal-TPMS Body diagonals with nodes': {
+        'terms': [(2, 'cos', 'cos', None), (2, None, 'cos', 'cos'), (2, 'cos', None, 'cos'),
+                  (-1, 'cos2', None, None), (-1, None, 'cos2', None), (-1, None, None, 'cos2')],
+        'constant': 0,
+        't': 0},
+    'Shell-TPMS Gyroid': {
+        'terms': [(1, 'cos', 'sin', None), (1, None, 'cos', 'sin'), (1, 'sin', None, 'cos')],
+        'constant': 0,
+        't': 0.125},
+    'Shell-TPMS Diamond': {
+        'terms': [(1, 'sin', 'sin', 'sin'), (1, 'sin', 'cos', 'cos'), (1, 'cos', 'sin', 'cos'), (1, 'cos', 'cos', 'sin')],
+        'constant': 0,
+        't': 0.115},
+    'Shell-TPMS Lidinoid': {
+        'terms': [(1, 'sin2', 'cos', 'sin'), (1, 'sin', 'sin2', 'cos'), (1, 'cos', 'sin', 'sin2'),
+                  (-1, 'cos2', 'cos2', None), (-1, None, 'cos2', 'cos2'), (-1, 'cos2', None, 'cos2')],
+        'constant': 0.3,
+        't': 0.37},
+    'Shell-TPMS Split-P': {
+        'terms': [(1.1, 'sin2', 'cos', 'sin'), (1.1, 'sin', 'sin2', 'cos'), (1.1, 'cos', 'sin', 'sin2'),
+                  (-0.2, 'cos2', 'cos2', None), (-0.2, None, 'cos2', 'cos2'), (-0.2, 'cos2', None, 'cos2'),
+                  (-0.4, 'cos2', None, None), (-0.4, None, 'cos2', None), (-0.4, None, None, 'cos2')],
+        'constant': 0,
+        't': 0.19},
+    'Shell-TPMS Schwarz': {
+        'terms': [(1, 'cos', None, None), (1, None, 'cos', None), (1, None, None, 'cos')],
+        'constant': 0,
+        't': 0.0875},
+}
+
+# Axis trigonometric functions
+def axis_functions(axis, cell_size, origin, dtype = np.float64):
+    w = 1 / cell_size * 2 * np.pi
+    angle = w * (axis + origin)
+
+    functions = {
+        'sin': np.sin(angle),
+        'cos': np.cos(angle),
+        'sin2': np.sin(2 * angle),
+        'cos2': np.cos(2 * angle)
+    }
+
+    return {name: values.astype(dtype, copy = False) for name, values in functions.items()}
+
+# TPMS field
+# backend selects how F is assembled (FIELD_BACKEND by default): NumPy broadcasting, or a fused kernel.
+def tpms_field(spacing, c, tpms_design, cell_sizes, origin, dtype = np.float64, silent = False, out = None, scratch = None, backend = None):
+    if tpms_design not in TPMS_DESIGNS:
+        if not silent:
+            print('Design not found in library')
+        return 0, 0
+    design = TPMS_DESIGNS[tpms_design]
+    if out is not None:
+        dtype = out.dtype
+
+    # Evaluate sin/cos once per axis on the 1-D grid vectors:
+    shape = (len(spacing[0]), len(spacing[1]), len(spacing[2]))
+    functions = [axis_functions(spacing[i], cell_sizes[i], origin[i], dtype) for i in range(3)]
+
+    # Fused kernel (a single pass over F, without full-size temporaries):
+    kernel = field_kernel(FIELD_BACKEND if backend is None else backend)
+    if kernel is not None:
+        F = np.empty(shape, dtype = dtype) if out is None else out
+        kernel(F, *field_planes(design, functions, c, shape, dtype))
+
+        return F, design['t']
+
+    # Assemble F by broadcasting the 1-D factors of every term:
+    if out is None:
+        F = np.full(shape, design['constant'] - c, dtype = dtype)
+    else:
+        F = out
+        F[...] = design['constant'] - c
+    for coefficient, *names in design['terms']:
+        factors = []
+        for i, name in enumerate(names):
+            if name is not None:
+                broadcast_shape = [1, 1, 1]
+                broadcast_shape[i] = shape[i]
+                factors.append(functions[i][name].reshape(broadcast_shape))
+
+        term = coefficient * factors[0] if coefficient != 1 else factors[0]
+        for factor in factors[1:-1]:
+            term = term * factor
+
+        if len(factors) == 3:
+            # Only products of three factors span the full volume:
+            if scratch is None or scratch.shape != shape or scratch.dtype != dtype:
+                scratch = np.empty(shape, dtype = dtype)
+            np.multiply(term, factors[-1], out = scratch)
+            F += scratch
+        elif len(factors) == 2:
+            F += term * factors[-1]
+        else:
+            F += term
+
+    return F, design['t']
+
+# FIELD BACKENDS
+# Optional accelerators for tpms_field (TPMSGEN_FIELD_BACKEND environment variable, 'auto' by default):
+# 'numba' (compiled and multi-threaded), 'numexpr' (multi-threaded) or 'numpy'. 'auto' uses the first
+# one installed. Accelerators are only imported when a field is first evaluated.
+FIELD_BACKEND = os.environ.get('TPMSGEN_FIELD_BACKEND', 'auto')
+FIELD_BACKENDS = ['numba', 'numexpr', 'numpy']
+
+# Field backend name
+# Backend actually used for the given setting ('auto' resolves to the first one installed):
+@functools.lru_cache(maxsize = None)
+def field_backend_name(backend):
+    if backend == 'auto':
+        for name in FIELD_BACKENDS:
+            try:
+                field_kernel(name)
+                return name
+            except ImportError:
+                pass
+
+    return backend
+
+# Field kernel
+# Function that fills F from the field planes, or None for the NumPy backend:
+@functools.lru_cache(maxsize = None)
+def field_kernel(backend):
+    if backend == 'auto':
+        return field_kernel(field_backend_name(backend))
+    if backend == 'numba':
+        try:
+            import numba
+        except ImportError:
+            raise ImportError('Numba is required for the numba field backend (pip install numba).')
+        return numba_kernel(numba)
+    if backend == 'numexpr':
+        try:
+            import numexpr
+        except ImportError:
+            raise ImportError('NumExpr is required for the numexpr field backend (pip install numexpr).')
+        return functools.partial(numexpr_kernel, numexpr)
+    if backend == 'numpy':
+        return None
+
+    raise ValueError('Unknown field backend: ' + str(backend))
+
+# Field planes
+# Every term is a product of one function per axis, so F = P[0] + sum(P[f] * Z[f]), P[f] being the sum of
+# the X * Y factors of the terms whose Z factor is Z[f] (P[0] holds the terms without Z factor and the
+# constant). Only the planes (nx * ny) and the Z functions (nz) are computed in advance.
+def field_planes(design, functions, c, shape, dtype):
+    z_names = [None] + sorted({names[2] for _, *names in design['terms'] if names[2] is not None})
+
+    planes = np.zeros((len(z_names), shape[0], shape[1]), dtype = dtype)
+    planes[0] += design['constant'] - c
+    for coefficient, *names in design['terms']:
+        x_factor = functions[0][names[0]][:, np.newaxis] if names[0] is not None else np.ones((shape[0], 1), dtype = dtype)
+        y_factor = functions[1][names[1]][np.newaxis, :] if names[1] is not None else np.ones((1, shape[1]), dtype = dtype)
+        planes[z_names.index(names[2])] += coefficient * x_factor * y_factor
+
+    z_functions = np.ones((len(z_names), shape[2]), dtype = dtype)
+    for f, name in enumerate(z_names[1:], 1):
+        z_functions[f] = functions[2][name]
+
+    return planes, z_functions
+
+# NumExpr kernel
+def numexpr_kernel(numexpr, F, planes, z_functions):
+    variables = {'p0': planes[0][:, :, np.newaxis]}
+    expression = 'p0'
+    for f in range(1, len(planes)):
+        variables['p' + str(f)] = planes[f][:, :, np.newaxis]
+        variables['z' + str(f)] = z_functions[f][np.newaxis, np.newaxis, :]
+        expression += ' + p' + str(f) + ' * z' + str(f)
+
+    numexpr.evaluate(expression, local_dict = variables, out = F)
+
+# Numba kernel
+# Compiled on first use for every field dtype (and cached on disk). Rows of F along Z are filled in
+# parallel over X, each one staying in cache while the planes are accumulated. Unless another threading
+# layer is set with NUMBA_THREADING_LAYER, the fork-safe workqueue layer is used (with TBB, a process that
+# runs the kernel and then forks the brick or batch worker processes hangs at exit). It does not support
+# concurrent launches, so calls from several threads (GUI preview and generation) are serialised.
+NUMBA_LOCK = threading.Lock()
+
+def numba_kernel(numba):
+    if 'NUMBA_THREADING_LAYER' not in os.environ:
+        numba.config.THREADING_LAYER = 'workqueue'
+
+    @numba.njit(parallel = True, cache = True)
+    def kernel(F, planes, z_functions):
+        for i in numba.prange(F.shape[0]):
+            for j in range(F.shape[1]):
+                row = F[i, j]
+                row[:] = planes[0, i, j]
+                for f in range(1, planes.shape[0]):
+                    plane = planes[f, i, j]
+                    for k in range(F.shape[2]):
+                        row[k] += plane * z_functions[f, k]
+
+    def serialised_kernel(F, planes, z_functions):
+        with NUMBA_LOCK:
+            kernel(F, planes, z_functions)
+
+    return serialised_kernel